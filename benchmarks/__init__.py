@@ -0,0 +1,6 @@
+"""Benchmarks.
+
+Run from the repository root, e.g. `python -m benchmarks.bench_client`.
+`bench_client` runs against `fake_cloud`, a local stand-in for the Pentair
+cloud, so no network access or account is needed.
+"""
@@ -0,0 +1,198 @@
+"""Benchmark the clients against a local fake Pentair cloud.
+
+Measures throughput, p50/p99 latency and peak memory of `get_devices()`, the
+identity credential exchange, token refresh and field decoding. Results can be
+written with `--output` and compared against an earlier run with `--baseline`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import time
+import tracemalloc
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from pypentair import Pentair
+from pypentair.utils import decode_fields
+
+from .fake_cloud import FakeCloud
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """Return the nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+def _summary(latencies: list[float], elapsed: float) -> dict[str, float]:
+    """Summarize latencies in milliseconds and throughput in operations/s."""
+    return {
+        "ops_per_s": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+def _timed(function: Callable[[], Any], count: int, workers: int = 1) -> dict:
+    """Run `function` `count` times on `workers` threads and summarize."""
+
+    def run() -> float:
+        start = time.perf_counter()
+        function()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if workers == 1:
+        latencies = [run() for _ in range(count)]
+    else:
+        with ThreadPoolExecutor(workers) as executor:
+            latencies = list(executor.map(lambda _: run(), range(count)))
+    return _summary(latencies, time.perf_counter() - start)
+
+
+def bench_get_devices(cloud: FakeCloud, count: int, workers: int) -> dict:
+    """Benchmark `Pentair.get_devices()`."""
+    with Pentair(**cloud.tokens, **cloud.client_kwargs) as account:
+        account.get_devices()
+        return _timed(account.get_devices, count, workers)
+
+
+def bench_get_devices_by_id(cloud: FakeCloud, count: int, workers: int) -> dict:
+    """Benchmark fetching every device one by one, sequentially and batched."""
+    device_ids = [device["deviceId"] for device in cloud.devices]
+    with Pentair(**cloud.tokens, **cloud.client_kwargs) as account:
+        account.get_auth()
+        sequential = _timed(lambda: [account.get_device(i) for i in device_ids], count)
+        batched = _timed(
+            lambda: account.get_devices_by_id(device_ids, concurrency=workers), count
+        )
+    return {
+        "sequential_p50_ms": sequential["p50_ms"],
+        "batched_p50_ms": batched["p50_ms"],
+    }
+
+
+def bench_async_get_devices(cloud: FakeCloud, count: int, workers: int) -> dict:
+    """Benchmark `AsyncPentair.get_devices()` with `workers` concurrent calls."""
+    from pypentair.aio import AsyncPentair
+
+    async def main() -> dict:
+        async with AsyncPentair(**cloud.tokens, **cloud.client_kwargs) as account:
+            await account.get_devices()
+            semaphore = asyncio.Semaphore(workers)
+
+            async def run() -> float:
+                async with semaphore:
+                    start = time.perf_counter()
+                    await account.get_devices()
+                    return time.perf_counter() - start
+
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*(run() for _ in range(count)))
+            return _summary(list(latencies), time.perf_counter() - start)
+
+    return asyncio.run(main())
+
+
+def bench_credential_exchange(cloud: FakeCloud, count: int) -> dict:
+    """Benchmark a cold `get_auth()`: token verification and identity exchange."""
+
+    def exchange() -> None:
+        with Pentair(**cloud.tokens, **cloud.client_kwargs) as account:
+            account.get_auth()
+
+    exchange()
+    return _timed(exchange, count)
+
+
+def bench_token_refresh(cloud: FakeCloud, count: int) -> dict:
+    """Benchmark refreshing expired tokens."""
+    expired, _ = cloud.create_tokens(expires_in=-60)
+
+    def refresh() -> None:
+        with Pentair(**expired, **cloud.client_kwargs) as account:
+            account.get_user()
+
+    refresh()
+    return _timed(refresh, count)
+
+
+def bench_decode(cloud: FakeCloud, count: int) -> dict:
+    """Benchmark decoding the fields of every device in the payload."""
+    devices = cloud.devices
+
+    def decode() -> None:
+        for device in devices:
+            decode_fields(device["fields"], device["deviceType"])
+
+    return _timed(decode, count)
+
+
+def bench_memory(cloud: FakeCloud) -> dict:
+    """Measure the peak memory of one `get_devices()` call."""
+    with Pentair(**cloud.tokens, **cloud.client_kwargs) as account:
+        account.get_devices()
+        tracemalloc.start()
+        devices = account.get_devices()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"peak_kib": peak / 1024, "devices": len(devices)}
+
+
+def main() -> None:
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=20, help="devices per account")
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency (s)")
+    parser.add_argument("--count", type=int, default=200, help="iterations")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent requests")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare with earlier results")
+    args = parser.parse_args()
+
+    results: dict[str, dict] = {}
+    with FakeCloud(devices=args.devices, latency=args.latency) as cloud:
+        results["get_devices"] = bench_get_devices(cloud, args.count, 1)
+        results["get_devices_threads"] = bench_get_devices(
+            cloud, args.count, args.workers
+        )
+        results["get_devices_by_id"] = bench_get_devices_by_id(
+            cloud, max(1, args.count // 20), args.workers
+        )
+        try:
+            results["async_get_devices"] = bench_async_get_devices(
+                cloud, args.count, args.workers
+            )
+        except ImportError:
+            pass
+        results["credential_exchange"] = bench_credential_exchange(
+            cloud, max(1, args.count // 10)
+        )
+        results["token_refresh"] = bench_token_refresh(cloud, max(1, args.count // 10))
+        results["decode_fields"] = bench_decode(cloud, args.count)
+        results["memory"] = bench_memory(cloud)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else {}
+    for name, metrics in results.items():
+        line = ", ".join(
+            f"{metric} {value:.2f}"
+            + (
+                f" ({(value / old - 1) * 100:+.1f}%)"
+                if (old := baseline.get(name, {}).get(metric))
+                else ""
+            )
+            for metric, value in metrics.items()
+        )
+        print(f"{name:<22} {line}")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
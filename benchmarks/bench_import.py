@@ -0,0 +1,46 @@
+"""Benchmark import (startup) time."""
+
+from __future__ import annotations
+
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("boto3", "botocore", "pycognito")
+STATEMENTS = (
+    "import pypentair",
+    "from pypentair.utils import get_api_field_name_and_value",
+    "from pypentair import Pentair",
+)
+RUNS = 11
+
+
+def measure(statement: str) -> tuple[float, list[str]]:
+    """Return the median wall time of `statement` and the heavy modules it loaded."""
+    code = f"{statement}\nimport sys\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", code], check=True, capture_output=True, text=True
+        )
+        timings.append(time.perf_counter() - start)
+    loaded = [module for module in result.stdout.strip().split(",") if module]
+    return statistics.median(timings), loaded
+
+
+def main() -> None:
+    """Run the benchmark."""
+    baseline, _ = measure("pass")
+    print(f"{'interpreter startup':<60} {baseline * 1000:7.1f} ms")
+    for statement in STATEMENTS:
+        elapsed, loaded = measure(statement)
+        print(
+            f"{statement:<60} {(elapsed - baseline) * 1000:7.1f} ms"
+            f"  loads: {', '.join(loaded) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Benchmark parsing device list responses.
+
+Compares the standard library's `json.loads` against `json_loads`, which is
+`orjson.loads` when the `fast` extra is installed.
+"""
+
+from __future__ import annotations
+
+import json
+import timeit
+
+from pypentair.utils import JSON_BACKEND, json_loads
+from tests.common import INTELLIFLO_SENSOR, SALT_SENSOR
+
+NUMBER = 200
+
+
+def main() -> None:
+    """Run the benchmark."""
+    for devices in (2, 100, 1000):
+        body = json.dumps(
+            [
+                {**(INTELLIFLO_SENSOR if index % 2 else SALT_SENSOR), "deviceId": index}
+                for index in range(devices)
+            ]
+        ).encode()
+        print(f"{devices} devices ({len(body)} bytes)")
+        for name, func in (
+            ("json.loads", lambda: json.loads(body)),
+            (f"json_loads ({JSON_BACKEND})", lambda: json_loads(body)),
+        ):
+            elapsed = min(timeit.repeat(func, number=NUMBER, repeat=5))
+            print(f"  {name:<24} {elapsed / NUMBER * 1e6:10.1f} us/response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Benchmark memory per device of models against raw dicts."""
+
+from __future__ import annotations
+
+import json
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from pypentair.models import device_from_dict
+from tests.common import INTELLIFLO_SENSOR, SALT_SENSOR
+
+COUNT = 5_000
+
+
+def measure(build: Callable[[], list[Any]]) -> float:
+    """Return the bytes retained per device by the result of `build`."""
+    tracemalloc.start()
+    devices = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del devices
+    return size / COUNT
+
+
+def main() -> None:
+    """Run the benchmark."""
+    for name, fixture in (("IF31", INTELLIFLO_SENSOR), ("SSS1", SALT_SENSOR)):
+        payload = json.dumps([fixture] * COUNT)
+        raw = measure(lambda: json.loads(payload))
+        model = measure(lambda: [device_from_dict(d) for d in json.loads(payload)])
+        print(f"{name}: raw dict {raw:8.0f} B/device, model {model:8.0f} B/device")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark redaction and request logging on realistic payloads."""
+
+from __future__ import annotations
+
+import copy
+import io
+import logging
+import timeit
+
+from pypentair.utils import LazyRedact, redact
+from tests.common import INTELLIFLO_SENSOR, SALT_SENSOR
+
+DEVICES = 100
+NUMBER = 200
+
+_LOGGER = logging.getLogger("pypentair.benchmark")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    payload = [
+        copy.deepcopy(INTELLIFLO_SENSOR if i % 2 else SALT_SENSOR)
+        for i in range(DEVICES)
+    ]
+    for device in payload:
+        device["deviceId"] = device["email"] = "sensitive"
+
+    for level in (logging.INFO, logging.DEBUG):
+        logging.basicConfig(
+            level=level, handlers=[logging.StreamHandler(io.StringIO())], force=True
+        )
+        for name, func in (
+            ("redact", lambda: redact(payload)),
+            (
+                "debug(..., redact(payload))",
+                lambda: _LOGGER.debug("%s", redact(payload)),
+            ),
+            (
+                "debug(..., LazyRedact(payload))",
+                lambda: _LOGGER.debug("%s", LazyRedact(payload)),
+            ),
+        ):
+            elapsed = min(timeit.repeat(func, number=NUMBER, repeat=5))
+            print(
+                f"{logging.getLevelName(level):<5} {name:<34}"
+                f" {elapsed / NUMBER * 1e6:9.1f} us/{DEVICES} devices"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark per-request SigV4 signing.
+
+Compares building, signing and preparing an `AWSRequest` with botocore's
+`SigV4Auth` against `Signer.sign`, which caches the derived signing key and
+signs the outgoing headers directly.
+"""
+
+from __future__ import annotations
+
+import timeit
+from urllib.parse import urljoin
+
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+from pypentair.const import REGION_NAME
+from pypentair.pentair import BASE_URL, DEVICES_URL
+from pypentair.signer import Signer
+
+NUMBER = 5000
+
+CREDENTIALS = Credentials("access-key", "secret-key", "session-token" * 40)
+HEADERS = {"x-amz-id-token": "id-token" * 120}
+URL = urljoin(BASE_URL, DEVICES_URL)
+
+
+def botocore_sign(auth: SigV4Auth) -> dict[str, str]:
+    """Sign the way the clients did before `Signer`."""
+    request = AWSRequest(method="get", url=URL, headers=HEADERS)
+    auth.add_auth(request)
+    return dict(request.prepare().headers)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    auth = SigV4Auth(CREDENTIALS, "execute-api", REGION_NAME)
+    signer = Signer(CREDENTIALS)
+    for name, func in (
+        ("SigV4Auth + AWSRequest.prepare", lambda: botocore_sign(auth)),
+        ("Signer.add_auth + prepare", lambda: botocore_sign(signer)),
+        ("Signer.sign", lambda: signer.sign("get", URL, HEADERS)),
+    ):
+        elapsed = min(timeit.repeat(func, number=NUMBER, repeat=5))
+        print(f"{name:<32} {elapsed / NUMBER * 1e6:7.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark peak memory of `iter_devices()` against `get_devices()`.
+
+Each mode runs in a forked process against a local fake cloud, reporting the
+peak Python heap (tracemalloc) and the growth of the peak RSS while all
+devices are consumed one at a time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import resource
+import tracemalloc
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from pypentair import Pentair
+
+from .fake_cloud import FakeCloud
+
+MODES: dict[str, Callable[[Pentair], Iterable[Any]]] = {
+    "get_devices": lambda account: account.get_devices(),
+    "iter_devices": lambda account: account.iter_devices(),
+    "iter_devices_models": lambda account: account.iter_devices(models=True),
+}
+
+
+def _measure(cloud: FakeCloud, mode: str, results: Any) -> None:
+    """Consume every device and report the peak memory."""
+    with Pentair(**cloud.tokens, **cloud.client_kwargs) as account:
+        account.get_auth()
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tracemalloc.start()
+        count = sum(1 for _ in MODES[mode](account))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+    results.put((mode, count, peak, rss))
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=20_000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    with FakeCloud(devices=args.devices) as cloud:
+        print(f"{args.devices} devices, {cloud.payload_size / 2**20:.1f} MiB")
+        for mode in MODES:
+            process = context.Process(target=_measure, args=(cloud, mode, results))
+            process.start()
+            mode, count, peak, rss = results.get()
+            process.join()
+            print(
+                f"{mode:<20} {count} devices, peak heap {peak / 2**20:7.1f} MiB, "
+                f"peak RSS +{rss / 1024:7.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
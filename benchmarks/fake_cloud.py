@@ -0,0 +1,178 @@
+"""Local stand-in for the Pentair cloud and its Cognito services.
+
+Serves the device endpoints of `api.pentair.cloud` and the Cognito identity
+and user pool JSON APIs (including the JWKS) from one threaded HTTP server,
+with configurable latency and payload size, so clients can be benchmarked
+without network access.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from pypentair.const import USER_POOL_ID
+from pypentair.utils import decode
+from tests.common import INTELLIFLO_SENSOR, SALT_SENSOR, create_tokens
+
+DEVICES_PATH = "/device/device-service/user/devices"
+DEVICE_PATH = "/device/device-service/user/device/"
+
+
+class FakeCloud:
+    """Fake Pentair cloud running in a background thread."""
+
+    def __init__(
+        self, *, devices: int = 2, latency: float = 0.0, token_lifetime: int = 3600
+    ) -> None:
+        """Initialize.
+
+        `devices` IntelliFlo and salt sensor fixtures are served, alternating,
+        and every response is delayed by `latency` seconds. Responses queued
+        in `errors` as `(status, headers, body)` are served to device
+        requests first.
+        """
+        self.latency = latency
+        self.errors: list[tuple[int, dict[str, str], bytes]] = []
+        self.token_lifetime = token_lifetime
+        self.calls: Counter[str] = Counter()
+        self.devices: list[dict[str, Any]] = [
+            {
+                **(INTELLIFLO_SENSOR if index % 2 else SALT_SENSOR),
+                "deviceId": f"device{index}",
+            }
+            for index in range(devices)
+        ]
+        self._devices_body = json.dumps(self.devices).encode()
+        self._key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.cloud = self  # type: ignore[attr-defined]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self.tokens, self.jwks = self.create_tokens()
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def payload_size(self) -> int:
+        """Return the size in bytes of the device list response."""
+        return len(self._devices_body)
+
+    @property
+    def client_kwargs(self) -> dict[str, Any]:
+        """Return the client arguments to use this server."""
+        return {"base_url": f"{self.url}/", "aws_endpoint_url": self.url}
+
+    def create_tokens(
+        self, expires_in: int | None = None
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        """Return tokens signed by this server and its JWKS."""
+        return create_tokens(
+            f"{self.url}/{decode(USER_POOL_ID)}",
+            expires_in=self.token_lifetime if expires_in is None else expires_in,
+            key=self._key,
+        )
+
+    def __enter__(self) -> FakeCloud:
+        """Start the server."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle(
+        self, method: str, path: str, target: str | None
+    ) -> tuple[int, dict[str, str], bytes]:
+        """Return the status, extra headers and body for a request."""
+        if self.latency:
+            time.sleep(self.latency)
+        if method == "POST" and target:
+            self.calls[target] += 1
+            status, body = self._cognito(target)
+            return status, {}, body
+        self.calls[path] += 1
+        if self.errors and (path == DEVICES_PATH or path.startswith(DEVICE_PATH)):
+            return self.errors.pop(0)
+        if path == DEVICES_PATH:
+            return 200, {}, self._devices_body
+        if path.startswith(DEVICE_PATH):
+            device_id = path.removeprefix(DEVICE_PATH)
+            for device in self.devices:
+                if device["deviceId"] == device_id:
+                    return 200, {}, json.dumps(device).encode()
+        if path.endswith("/.well-known/jwks.json"):
+            return 200, {}, json.dumps(self.jwks).encode()
+        return 404, {}, b'{"message": "Not found"}'
+
+    def _cognito(self, target: str) -> tuple[int, bytes]:
+        """Return the response to a Cognito JSON API request."""
+        operation = target.rpartition(".")[2]
+        if operation == "GetId":
+            return 200, json.dumps({"IdentityId": "us-west-2:identity"}).encode()
+        if operation == "GetCredentialsForIdentity":
+            credentials = {
+                "AccessKeyId": "ASIAFAKE",
+                "SecretKey": "secret",
+                "SessionToken": "session",
+                "Expiration": time.time() + 3600,
+            }
+            return 200, json.dumps(
+                {"IdentityId": "us-west-2:identity", "Credentials": credentials}
+            ).encode()
+        if operation == "InitiateAuth":
+            tokens, _ = self.create_tokens()
+            result = {
+                "AccessToken": tokens["access_token"],
+                "IdToken": tokens["id_token"],
+                "TokenType": "Bearer",
+                "ExpiresIn": self.token_lifetime,
+            }
+            return 200, json.dumps({"AuthenticationResult": result}).encode()
+        if operation == "GlobalSignOut":
+            return 200, b"{}"
+        return 400, json.dumps({"message": f"Unsupported {operation}"}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler delegating to the `FakeCloud`."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        """Handle a GET request."""
+        self._respond("GET")
+
+    def do_POST(self) -> None:
+        """Handle a POST request."""
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._respond("POST")
+
+    def _respond(self, method: str) -> None:
+        """Send the response."""
+        cloud: FakeCloud = self.server.cloud  # type: ignore[attr-defined]
+        status, headers, body = cloud.handle(
+            method, self.path.split("?")[0], self.headers.get("X-Amz-Target")
+        )
+        self.send_response(status)
+        for name, value in {"Content-Type": "application/json", **headers}.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Do not log requests."""
@@ -7,11 +7,13 @@ import asyncio
 import logging
 import os
 from pathlib import Path
+from typing import Any
 
-from deepdiff import DeepDiff
 from dotenv import set_key
 
 from pypentair import Pentair, PentairAuthenticationError
+from pypentair.refresher import TokenRefresher
+from pypentair.tracker import DeviceTracker
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -34,30 +36,34 @@ async def main(keep_alive: bool = False) -> None:
         print(ex)
         return
 
-    for key, value in account.get_tokens().items():
-        set_key(ENV_PATH, key.upper(), value)
+    save_tokens(account, account.get_tokens())
 
-    devices = {}
+    refresher = TokenRefresher([account], on_tokens=save_tokens)
+    refresh_task = asyncio.create_task(refresher.run()) if keep_alive else None
+    tracker = DeviceTracker()
 
     while True:
         try:
-            _devices = account.get_devices()
-            diff = DeepDiff(
-                devices,
-                _devices,
-                ignore_order=True,
-                report_repetition=True,
-                verbose_level=2,
-            )
-            logging.debug(diff if diff else "No changes")
-            devices = _devices
+            changes = tracker.update(account.get_devices())
+            for change in changes:
+                logging.debug(change)
+            if not changes:
+                logging.debug("No changes")
         except Exception as ex:  # pylint: disable=broad-except
             logging.error(ex)
         if not keep_alive:
             break
         await asyncio.sleep(30)
 
-    for key, value in account.get_tokens().items():
+    if refresh_task is not None:
+        refresher.stop()
+        await refresh_task
+    save_tokens(account, account.get_tokens())
+
+
+def save_tokens(account: Any, tokens: dict[str, str]) -> None:
+    """Save the tokens to the .env file."""
+    for key, value in tokens.items():
         set_key(ENV_PATH, key.upper(), value)
 
 
@@ -1,7 +1,37 @@
 """pypentair module."""
 
-from .exceptions import PentairApiException, PentairAuthenticationError
-from .pentair import Pentair
+from __future__ import annotations
 
-__all__ = ["Pentair", "PentairApiException", "PentairAuthenticationError"]
+from typing import TYPE_CHECKING, Any
+
+from .exceptions import (
+    PentairApiException,
+    PentairAuthenticationError,
+    PentairCircuitOpenError,
+)
+
+if TYPE_CHECKING:
+    from .aio import AsyncPentair
+    from .pentair import Pentair
+
+__all__ = [
+    "AsyncPentair",
+    "Pentair",
+    "PentairApiException",
+    "PentairAuthenticationError",
+    "PentairCircuitOpenError",
+]
 __version__ = "0.0.0"
+
+
+def __getattr__(name: str) -> Any:
+    """Lazily import the clients, and with them boto3 and pycognito."""
+    if name == "Pentair":
+        from .pentair import Pentair
+
+        return Pentair
+    if name == "AsyncPentair":
+        from .aio import AsyncPentair
+
+        return AsyncPentair
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,579 @@
+"""Asynchronous Pentair account."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncIterator, Iterable, Mapping
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Final
+from urllib.parse import urljoin
+
+import aiohttp
+import jwt
+from botocore.credentials import Credentials
+from botocore.exceptions import ClientError
+
+from .cache import (
+    EXPIRATION_MARGIN,
+    Cache,
+    MemoryCache,
+    has_signing_keys,
+    identity_key,
+    is_expired,
+    jwks_key,
+    to_timestamp,
+    token_expiration,
+    tokens_key,
+)
+from .const import CLIENT_ID, IDENTITY_POOL_ID, REGION_NAME, USER_POOL_ID
+from .exceptions import PentairAuthenticationError
+from .instrumentation import (
+    PHASE_AUTH,
+    PHASE_NETWORK,
+    PHASE_PARSE,
+    PHASE_SIGN,
+    REFRESH_CREDENTIALS,
+    REFRESH_TOKENS,
+    Instrumentation,
+)
+from .models import device_from_dict
+from .pentair import (
+    BASE_URL,
+    DEFAULT_POOL_MAXSIZE,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+    DEVICE_URL,
+    DEVICES_URL,
+    STREAM_CHUNK_SIZE,
+    DeviceBatchResult,
+)
+from .resilience import (
+    RETRY_STATUSES,
+    CircuitBreaker,
+    TokenBucket,
+    backoff_time,
+    retry_after,
+)
+from .signer import Signer
+from .utils import JSONArrayParser, LazyRedact, decode, json_loads
+
+if TYPE_CHECKING:
+    from pycognito import Cognito
+
+_LOGGER = logging.getLogger(__name__)
+
+COGNITO_IDENTITY_URL: Final = f"https://cognito-identity.{REGION_NAME}.amazonaws.com/"
+COGNITO_IDP_URL: Final = f"https://cognito-idp.{REGION_NAME}.amazonaws.com/"
+
+
+class AsyncPentair:
+    """Asynchronous Pentair account.
+
+    Token refresh, identity credential exchange and API requests are all made
+    with `aiohttp` so they never block the event loop. Only the initial
+    password (SRP) authentication is delegated to a worker thread.
+    """
+
+    _auth: Signer | None = None
+    _expiration: float | None = None
+    _verified: bool = False
+
+    def __init__(
+        self,
+        *,
+        username: str | None = None,
+        access_token: str | None = None,
+        id_token: str | None = None,
+        refresh_token: str | None = None,
+        session: aiohttp.ClientSession | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        rate_limiter: TokenBucket | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        cache: Cache | None = None,
+        base_url: str = BASE_URL,
+        aws_endpoint_url: str | None = None,
+        instrumentation: Instrumentation | None = None,
+    ) -> None:
+        """Initialize.
+
+        If `session` is provided it is used as-is and is not closed by
+        `close()`, otherwise a session is created on first use. `timeout`
+        applies to every request either way.
+
+        GET requests failing with 429, 5xx or a connection error are retried
+        up to `retries` times with jittered exponential backoff, or after the
+        `Retry-After` delay. Requests wait for `rate_limiter` and fail fast
+        with `PentairCircuitOpenError` while `circuit_breaker` is open.
+
+        The identity id, temporary AWS credentials and the user pool's JSON
+        Web Key Set are stored in `cache`, which defaults to an in-memory
+        cache for this instance. With a `username`, the tokens are stored
+        too, and restored from it when none are given.
+
+        `base_url` and `aws_endpoint_url` (used for both Cognito services)
+        allow pointing the client at another deployment or a local stand-in.
+
+        Request phase timings, sizes, status codes and credential refreshes
+        are reported to `instrumentation`, if provided.
+        """
+        self._cache = cache or MemoryCache()
+        if username and not (access_token or id_token or refresh_token):
+            tokens = self._cache.get(tokens_key(username)) or {}
+            access_token = tokens.get("access_token")
+            id_token = tokens.get("id_token")
+            refresh_token = tokens.get("refresh_token")
+        self._username = username
+        self._access_token = access_token
+        self._id_token = id_token
+        self._refresh_token = refresh_token
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._retries = retries
+        self._rate_limiter = rate_limiter
+        self._circuit_breaker = circuit_breaker
+        self._base_url = base_url
+        self._identity_url = aws_endpoint_url or COGNITO_IDENTITY_URL
+        self._idp_url = aws_endpoint_url or COGNITO_IDP_URL
+        self._instrumentation = instrumentation or Instrumentation()
+        self._owns_session = session is None
+        self._session = session
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> AsyncPentair:
+        """Enter the runtime context."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit the runtime context and close the session."""
+        await self.close()
+
+    @property
+    def access_token(self) -> str | None:
+        """Return the access token."""
+        return self._access_token
+
+    @property
+    def id_token(self) -> str | None:
+        """Return the id token."""
+        return self._id_token
+
+    @property
+    def refresh_token(self) -> str | None:
+        """Return the refresh token."""
+        return self._refresh_token
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the HTTP session."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=self._timeout)
+        return self._session
+
+    async def close(self) -> None:
+        """Close the HTTP session if it is owned by this instance."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+
+    async def get_tokens(self) -> dict[str, str]:
+        """Return the tokens."""
+        if self._access_token:
+            await self.check_token()
+            return {
+                "access_token": self._access_token,
+                "id_token": self._id_token or "",
+                "refresh_token": self._refresh_token or "",
+            }
+        return {}
+
+    async def authenticate(self, password: str) -> None:
+        """Authenticate a user."""
+
+        def _authenticate() -> Cognito:
+            from pycognito import Cognito
+
+            user = Cognito(
+                decode(USER_POOL_ID), decode(CLIENT_ID), username=self._username
+            )
+            user.authenticate(password=password)
+            return user
+
+        try:
+            user = await asyncio.to_thread(_authenticate)
+        except ClientError as err:
+            _LOGGER.error(err)
+            raise PentairAuthenticationError(err) from err
+        self._set_tokens(user.access_token, user.id_token, user.refresh_token)
+        self._verified = True
+
+    async def logout(self) -> None:
+        """Logout of all clients (including app)."""
+        await self._cognito_request(
+            self._idp_url,
+            "AWSCognitoIdentityProviderService.GlobalSignOut",
+            {"AccessToken": self._access_token},
+        )
+        self._set_tokens(None, None, None)
+
+    async def check_token(self) -> bool:
+        """Refresh the tokens if the access token has expired.
+
+        Returns whether the tokens were refreshed.
+        """
+        async with self._lock:
+            return await self._check_token()
+
+    async def get_auth(self) -> Signer:
+        """Return the request signer.
+
+        The identity credentials are reused until shortly before they expire.
+        """
+        async with self._lock:
+            if await self._check_token():
+                self._instrumentation.on_credential_refresh(REFRESH_TOKENS)
+            if self._auth is None or is_expired(self._expiration, time.time()):
+                credentials = await self._get_credentials()
+                self._auth = Signer(credentials)
+            return self._auth
+
+    async def refresh(self, margin: float = EXPIRATION_MARGIN) -> float:
+        """Refresh the tokens and identity credentials expiring within `margin`.
+
+        Returns the time at which the first of them expires, so the next
+        refresh can be scheduled ahead of it.
+        """
+        async with self._lock:
+            if await self._check_token(margin):
+                self._instrumentation.on_credential_refresh(REFRESH_TOKENS)
+            now = time.time()
+            if self._auth is None or is_expired(self._expiration, now, margin):
+                credentials = await self._get_credentials(margin)
+                self._auth = Signer(credentials)
+            return min(
+                token_expiration(self._access_token or ""), self._expiration or now
+            )
+
+    async def get_device(self, device_id: str, *, raw: bool = False) -> Any:
+        """Get device, as the unparsed JSON body if `raw`."""
+        return await self._request(
+            "get", DEVICE_URL.format(device_id=device_id), raw=raw
+        )
+
+    async def update_device(self, device_id: str, fields: Mapping[str, Any]) -> Any:
+        """Update device fields, e.g. `{"zp1e10": "0"}` to disable program 1."""
+        return await self._request(
+            "post",
+            DEVICE_URL.format(device_id=device_id),
+            data=json.dumps({"payload": dict(fields)}).encode(),
+        )
+
+    async def get_devices(self, *, raw: bool = False) -> Any:
+        """Get devices, as the unparsed JSON body if `raw`."""
+        return await self._request("get", DEVICES_URL, raw=raw)
+
+    async def get_devices_by_id(
+        self, device_ids: Iterable[str], *, concurrency: int = DEFAULT_POOL_MAXSIZE
+    ) -> DeviceBatchResult:
+        """Get several devices concurrently.
+
+        Credentials are obtained once before at most `concurrency` requests
+        are made at a time. Devices are returned in the order of `device_ids`,
+        and a failed device is reported in `errors` instead of failing the
+        batch.
+        """
+        device_ids = list(dict.fromkeys(device_ids))
+        result = DeviceBatchResult()
+        if not device_ids:
+            return result
+        await self.get_auth()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def get(device_id: str) -> Any:
+            async with semaphore:
+                return await self.get_device(device_id)
+
+        devices = await asyncio.gather(
+            *(get(device_id) for device_id in device_ids), return_exceptions=True
+        )
+        for device_id, device in zip(device_ids, devices):
+            if isinstance(device, Exception):
+                result.errors[device_id] = device
+            elif isinstance(device, BaseException):
+                raise device
+            else:
+                result.devices[device_id] = device
+        return result
+
+    async def iter_devices(self, *, models: bool = False) -> AsyncIterator[Any]:
+        """Iterate over the devices as the response body is received.
+
+        Unlike `get_devices()`, neither the whole body nor the list of all
+        devices is held in memory. Devices are yielded as `Device` models if
+        `models` is set.
+        """
+        response = await self._request("get", DEVICES_URL, stream=True)
+        async with response:
+            parser = JSONArrayParser()
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                for device in parser.feed(chunk):
+                    yield device_from_dict(device) if models else device
+            for device in parser.close():
+                yield device_from_dict(device) if models else device
+
+    async def _check_token(self, margin: float = 0) -> bool:
+        """Refresh the tokens if the access token expires within `margin`."""
+        if not self._access_token:
+            raise PentairAuthenticationError("Access token required")
+        if not self._verified:
+            await self._verify_tokens()
+        if not is_expired(token_expiration(self._access_token), time.time(), margin):
+            return False
+        response = await self._cognito_request(
+            self._idp_url,
+            "AWSCognitoIdentityProviderService.InitiateAuth",
+            {
+                "ClientId": decode(CLIENT_ID),
+                "AuthFlow": "REFRESH_TOKEN_AUTH",
+                "AuthParameters": {"REFRESH_TOKEN": self._refresh_token},
+            },
+        )
+        result = response["AuthenticationResult"]
+        self._set_tokens(
+            result["AccessToken"],
+            result["IdToken"],
+            result.get("RefreshToken", self._refresh_token),
+        )
+        return True
+
+    async def _get_credentials(self, margin: float = EXPIRATION_MARGIN) -> Credentials:
+        """Return the identity credentials from the cache or Cognito."""
+        key = identity_key(str(self._id_token))
+        cached = self._cache.get(key) or {}
+        credentials = cached.get("credentials")
+        if credentials is None or is_expired(
+            credentials["expiration"], time.time(), margin
+        ):
+            logins = {
+                f"cognito-idp.{REGION_NAME}.amazonaws.com/{decode(USER_POOL_ID)}": self._id_token
+            }
+            self._instrumentation.on_credential_refresh(REFRESH_CREDENTIALS)
+            if (identity_id := cached.get("identity_id")) is None:
+                response = await self._cognito_request(
+                    self._identity_url,
+                    "AWSCognitoIdentityService.GetId",
+                    {"IdentityPoolId": decode(IDENTITY_POOL_ID), "Logins": logins},
+                )
+                identity_id = response["IdentityId"]
+            response = await self._cognito_request(
+                self._identity_url,
+                "AWSCognitoIdentityService.GetCredentialsForIdentity",
+                {"IdentityId": identity_id, "Logins": logins},
+            )
+            credentials = {
+                "access_key_id": response["Credentials"]["AccessKeyId"],
+                "secret_key": response["Credentials"]["SecretKey"],
+                "session_token": response["Credentials"]["SessionToken"],
+                "expiration": to_timestamp(response["Credentials"]["Expiration"]),
+            }
+            self._cache.set(
+                key, {"identity_id": identity_id, "credentials": credentials}
+            )
+        self._expiration = credentials["expiration"]
+        return Credentials(
+            credentials["access_key_id"],
+            credentials["secret_key"],
+            credentials["session_token"],
+        )
+
+    def _set_tokens(
+        self, access_token: str | None, id_token: str | None, refresh_token: str | None
+    ) -> None:
+        """Set the tokens."""
+        self._access_token = access_token
+        self._id_token = id_token
+        self._refresh_token = refresh_token
+        self._save_tokens()
+
+    def _save_tokens(self) -> None:
+        """Store the tokens in the cache, if there is a username."""
+        if self._username:
+            self._cache.set(
+                tokens_key(self._username),
+                {
+                    "access_token": self._access_token,
+                    "id_token": self._id_token,
+                    "refresh_token": self._refresh_token,
+                },
+            )
+
+    async def _verify_tokens(self) -> None:
+        """Verify the signature and claims of the current tokens."""
+        pool_url = urljoin(self._idp_url, decode(USER_POOL_ID))
+        jwks = self._cache.get(jwks_key(decode(USER_POOL_ID)))
+        if not has_signing_keys(jwks, self._id_token, self._access_token):
+            async with self.session.get(
+                f"{pool_url}/.well-known/jwks.json", timeout=self._timeout
+            ) as response:
+                jwks = await response.json()
+            self._cache.set(jwks_key(decode(USER_POOL_ID)), jwks)
+        keys = {key["kid"]: key for key in jwks["keys"]}
+        for token, token_use in (
+            (self._id_token, "id"),
+            (self._access_token, "access"),
+        ):
+            try:
+                kid = jwt.get_unverified_header(token or "").get("kid")
+                claims = jwt.decode(
+                    token or "",
+                    jwt.PyJWK(keys[kid]).key,
+                    algorithms=["RS256"],
+                    audience=decode(CLIENT_ID) if token_use == "id" else None,
+                    issuer=pool_url,
+                    options={"verify_exp": False, "verify_iat": False},
+                )
+            except (jwt.PyJWTError, KeyError) as err:
+                raise PentairAuthenticationError(
+                    f"Your {token_use} token could not be verified ({err})"
+                ) from err
+            if claims.get("token_use") != token_use:
+                raise PentairAuthenticationError(
+                    f"Your {token_use} token use could not be verified"
+                )
+        self._verified = True
+        self._save_tokens()
+
+    async def _cognito_request(
+        self, url: str, target: str, payload: dict[str, Any]
+    ) -> Any:
+        """Make an unsigned Cognito API request."""
+        async with self.session.post(
+            url,
+            data=json.dumps(payload),
+            headers={
+                "Content-Type": "application/x-amz-json-1.1",
+                "X-Amz-Target": target,
+            },
+            timeout=self._timeout,
+        ) as response:
+            data = await response.json(content_type=None)
+        if response.status != 200:
+            _LOGGER.error("Status: %s - %s", response.status, data)
+            raise PentairAuthenticationError(
+                data.get("message") or data.get("Message") or data
+            )
+        return data
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        *,
+        stream: bool = False,
+        raw: bool = False,
+        **kwargs: Any,
+    ) -> Any:
+        """Make a request.
+
+        With `stream`, the unread `aiohttp.ClientResponse` of a successful
+        request is returned instead of its data; the caller must release it.
+        With `raw`, the body is returned as bytes.
+        """
+        _LOGGER.debug(
+            "Making %s request to %s with %s", method, url, LazyRedact(kwargs)
+        )
+
+        if self._rate_limiter is not None and (delay := self._rate_limiter.reserve()):
+            await asyncio.sleep(delay)
+
+        instrumentation = self._instrumentation
+        start = time.perf_counter()
+        auth = await self.get_auth()
+        signed = time.perf_counter()
+        instrumentation.on_phase(PHASE_AUTH, signed - start)
+
+        full_url = urljoin(self._base_url, url)
+        breaker = self._circuit_breaker
+        attempt = 0
+        while True:
+            headers = {"x-amz-id-token": str(self._id_token)}
+            if (body := kwargs.get("data")) is not None:
+                headers["Content-Type"] = "application/json"
+            headers = auth.sign(method, full_url, headers, body or b"")
+            sent = time.perf_counter()
+            instrumentation.on_phase(PHASE_SIGN, sent - signed)
+
+            if breaker is not None:
+                breaker.before_request()
+            retryable = method == "get" and attempt < self._retries
+            try:
+                response = await self.session.request(
+                    method, full_url, headers=headers, timeout=self._timeout, **kwargs
+                )
+                if not stream or response.status >= 300:
+                    async with response:
+                        content = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if breaker is not None:
+                    breaker.record_failure()
+                if not retryable:
+                    raise
+                wait = None
+            else:
+                if (status_code := response.status) not in RETRY_STATUSES:
+                    if breaker is not None:
+                        breaker.record_success()
+                    break
+                if breaker is not None:
+                    breaker.record_failure()
+                if not retryable:
+                    break
+                wait = retry_after(response.headers.get("Retry-After"))
+            attempt += 1
+            instrumentation.on_retry(method, url, attempt)
+            await asyncio.sleep(backoff_time(attempt) if wait is None else wait)
+            signed = time.perf_counter()
+        received = time.perf_counter()
+        instrumentation.on_phase(PHASE_NETWORK, received - sent)
+        if stream and status_code < 300:
+            instrumentation.on_request(
+                method,
+                url,
+                status_code,
+                received - start,
+                len(kwargs.get("data") or b""),
+                response.content_length or 0,
+            )
+            return response
+
+        # error bodies are not necessarily JSON; they are logged as text
+        if not (200 <= status_code < 300 and (raw or content)):
+            json_data = None
+        else:
+            json_data = content if raw else json_loads(content)
+        parsed = time.perf_counter()
+        instrumentation.on_phase(PHASE_PARSE, parsed - received)
+        instrumentation.on_request(
+            method,
+            url,
+            status_code,
+            parsed - start,
+            len(kwargs.get("data") or b""),
+            len(content),
+        )
+
+        if status_code >= 400:
+            _LOGGER.error(
+                "Status: %s - %s", status_code, content.decode(errors="replace")
+            )
+            response.raise_for_status()
+        _LOGGER.debug(
+            "Received %s response from %s: %s", status_code, url, LazyRedact(json_data)
+        )
+        return json_data
@@ -0,0 +1,38 @@
+"""AWS clients."""
+
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING
+
+from .const import REGION_NAME
+
+if TYPE_CHECKING:
+    from botocore.client import BaseClient
+
+_CLIENTS: dict[tuple[str, str, str | None], BaseClient] = {}
+_LOCK = threading.Lock()
+
+
+def get_client(
+    service_name: str,
+    region_name: str = REGION_NAME,
+    endpoint_url: str | None = None,
+) -> BaseClient:
+    """Return a shared boto3 client for a service, region and endpoint.
+
+    Clients are thread-safe once created, but creating one is not and
+    re-parses the botocore service model, so each is only created once per
+    process. boto3 is imported on first use to keep `import pypentair` fast.
+    """
+    key = (service_name, region_name, endpoint_url)
+    if (client := _CLIENTS.get(key)) is None:
+        with _LOCK:
+            if (client := _CLIENTS.get(key)) is None:
+                from boto3.session import Session
+
+                client = Session().client(
+                    service_name, region_name=region_name, endpoint_url=endpoint_url
+                )
+                _CLIENTS[key] = client
+    return client
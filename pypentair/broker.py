@@ -0,0 +1,279 @@
+"""Credential broker shared by worker processes."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Mapping
+from contextlib import suppress
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import TYPE_CHECKING, Any, Final, cast
+
+from botocore.credentials import Credentials
+
+from .cache import EXPIRATION_MARGIN, is_expired
+from .exceptions import PentairApiException
+from .pentair import Pentair
+from .signer import Signer
+
+if TYPE_CHECKING:
+    from pycognito import Cognito
+
+_LOGGER = logging.getLogger(__name__)
+
+Address = str | tuple[str, int]
+
+WORKER_MARGIN: Final = 60  # seconds; below the broker's margin
+
+
+class CredentialBroker:
+    """Own the tokens and identity credentials of accounts for other processes.
+
+    Each account's id token and AWS credentials are refreshed at most once
+    per expiry, however many workers ask for them, and handed out as plain
+    dicts (see `BrokeredPentair`). Serve it with `BrokerServer`.
+    """
+
+    def __init__(
+        self,
+        accounts: Mapping[str, Pentair] | None = None,
+        *,
+        margin: float = EXPIRATION_MARGIN,
+    ) -> None:
+        """Initialize with accounts by name."""
+        self._accounts = dict(accounts or {})
+        self._margin = margin
+        self._brokereds: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add_account(self, name: str, account: Pentair) -> None:
+        """Add an account."""
+        with self._lock:
+            self._accounts[name] = account
+            self._brokereds.pop(name, None)
+
+    def remove_account(self, name: str) -> None:
+        """Remove an account."""
+        with self._lock:
+            self._accounts.pop(name, None)
+            self._brokereds.pop(name, None)
+
+    def get_session(self, name: str) -> dict[str, Any]:
+        """Return the id token and AWS credentials of an account.
+
+        They are refreshed if they expire within the broker's margin.
+        Raises `KeyError` for an unknown account.
+        """
+        session = self._brokereds.get(name)
+        if session is not None and not is_expired(
+            session["expiration"], time.time(), self._margin
+        ):
+            return session
+        account = self._accounts[name]
+        # the account serializes refreshes, so concurrent callers wait for one
+        expiration = account.refresh(self._margin)
+        credentials = account.get_auth().credentials.get_frozen_credentials()
+        session = {
+            "id_token": account.id_token,
+            "access_key": credentials.access_key,
+            "secret_key": credentials.secret_key,
+            "token": credentials.token,
+            "expiration": expiration,
+        }
+        self._brokereds[name] = session
+        return session
+
+
+class BrokerServer:
+    """Serve a `CredentialBroker` to other processes.
+
+    Listens at `address`, a Unix socket path or a `(host, port)` tuple, and
+    only accepts clients with the same `authkey`. Each client connection is
+    served on its own daemon thread.
+    """
+
+    def __init__(
+        self, broker: CredentialBroker, address: Address, authkey: bytes
+    ) -> None:
+        """Initialize and start listening."""
+        self._broker = broker
+        self._authkey = authkey
+        self._listener = Listener(address, authkey=authkey)
+        self._closed = False
+        threading.Thread(
+            target=self._accept, name="pypentair-broker", daemon=True
+        ).start()
+
+    def __enter__(self) -> BrokerServer:
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Exit the runtime context and close the server."""
+        self.close()
+
+    @property
+    def address(self) -> Address:
+        """Return the address clients connect to."""
+        return self._listener.address
+
+    def close(self) -> None:
+        """Stop accepting clients."""
+        if self._closed:
+            return
+        self._closed = True
+        # wake up the accepting thread, which then closes the listener
+        with suppress(OSError):
+            Client(self.address, authkey=self._authkey).close()
+
+    def _accept(self) -> None:
+        """Accept clients until closed."""
+        with self._listener:
+            while not self._closed:
+                try:
+                    connection = self._listener.accept()
+                except (OSError, AuthenticationError) as err:
+                    _LOGGER.debug("Broker client rejected: %s", err)
+                    continue
+                threading.Thread(
+                    target=self._serve, args=(connection,), daemon=True
+                ).start()
+
+    def _serve(self, connection: Connection) -> None:
+        """Answer the session requests of one client."""
+        with connection:
+            while not self._closed:
+                try:
+                    name = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply: tuple[Any, Exception | None] = (
+                        self._broker.get_session(name),
+                        None,
+                    )
+                except Exception as ex:  # pylint: disable=broad-except
+                    reply = (None, ex)
+                try:
+                    connection.send(reply)
+                except (EOFError, OSError):
+                    return
+                except Exception:  # pylint: disable=broad-except
+                    # the error could not be pickled
+                    connection.send((None, PentairApiException(str(reply[1]))))
+
+
+class BrokerClient:
+    """Client of a `BrokerServer`, which may be shared between threads."""
+
+    def __init__(self, address: Address, authkey: bytes) -> None:
+        """Initialize."""
+        self._address = address
+        self._authkey = authkey
+        self._connection: Connection | None = None
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close the connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def get_session(self, name: str) -> dict[str, Any]:
+        """Return the id token and AWS credentials of an account."""
+        with self._lock:
+            for attempt in range(2):
+                if self._connection is None:
+                    self._connection = Client(self._address, authkey=self._authkey)
+                try:
+                    self._connection.send(name)
+                    session, error = self._connection.recv()
+                    break
+                except (EOFError, OSError):
+                    # the broker was restarted; reconnect once
+                    self._connection.close()
+                    self._connection = None
+                    if attempt:
+                        raise
+        if error is not None:
+            raise error
+        return cast(dict[str, Any], session)
+
+
+class BrokeredPentair(Pentair):
+    """Pentair account whose tokens and credentials come from a broker.
+
+    The account never calls Cognito itself. The broker is asked for a new
+    id token and credentials only when the current ones expire within
+    `margin`, which should be below the broker's, so workers share the
+    auth cost of each account. The broker owns the tokens, so
+    `get_tokens()` returns none and the Cognito user is not available.
+    """
+
+    def __init__(
+        self,
+        broker: BrokerClient,
+        name: str,
+        *,
+        margin: float = WORKER_MARGIN,
+        **kwargs: Any,
+    ) -> None:
+        """Initialize, passing `kwargs` to `Pentair`."""
+        super().__init__(**kwargs)
+        self._broker = broker
+        self._name = name
+        self._margin = margin
+        self._brokered: dict[str, Any] | None = None
+
+    @property
+    def id_token(self) -> str | None:
+        """Return the id token."""
+        return cast(str | None, self._get_session()["id_token"])
+
+    def get_auth(self) -> Signer:
+        """Return the request signer for the brokered credentials."""
+        session = self._get_session()
+        if (auth := self._auth) is None or auth.credentials.token != session["token"]:
+            auth = self._auth = Signer(
+                Credentials(
+                    session["access_key"], session["secret_key"], session["token"]
+                )
+            )
+        return auth
+
+    def get_user(self) -> Cognito:
+        """Raise, as the Cognito user is owned by the broker."""
+        raise PentairApiException(
+            "The tokens of a brokered account are owned by the broker"
+        )
+
+    def get_tokens(self) -> dict[str, str]:
+        """Return no tokens, as they are owned by the broker."""
+        return {}
+
+    def authenticate(self, password: str) -> None:
+        """Raise, as the broker's account must be authenticated instead."""
+        raise PentairApiException("Authenticate the broker's account instead")
+
+    def logout(self) -> None:
+        """Raise, as the broker's account must be logged out instead."""
+        raise PentairApiException("Log out the broker's account instead")
+
+    def refresh(self, margin: float = WORKER_MARGIN) -> float:
+        """Fetch the session from the broker if it expires within `margin`."""
+        return float(self._get_session(margin)["expiration"])
+
+    def _get_session(self, margin: float | None = None) -> dict[str, Any]:
+        """Return the session, fetching it from the broker when expiring."""
+        with self._lock:
+            session = self._brokered
+            if session is None or is_expired(
+                session["expiration"],
+                time.time(),
+                self._margin if margin is None else margin,
+            ):
+                session = self._brokered = self._broker.get_session(self._name)
+            return session
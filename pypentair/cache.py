@@ -0,0 +1,288 @@
+"""Caches."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Final
+
+EXPIRATION_MARGIN: Final = 300  # seconds before expiration to treat as expired
+
+
+class Cache(ABC):
+    """Key/value cache for JSON-serializable values."""
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Return the value for `key`, or `None` if missing."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """Store the value for `key`."""
+
+
+class MemoryCache(Cache):
+    """In-memory cache."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._data: dict[str, Any] = {}
+
+    def get(self, key: str) -> Any:
+        """Return the value for `key`, or `None` if missing."""
+        return self._data.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store the value for `key`."""
+        self._data[key] = value
+
+
+class FileCache(Cache):
+    """JSON file cache that survives restarts.
+
+    Writes are atomic and serialized with an exclusive lock on a `.lock` file
+    next to the cache, so several processes may share the same file without
+    losing each other's keys. Where `fcntl` is unavailable (Windows), writes
+    are only serialized within the process.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        """Initialize."""
+        self._path = Path(path)
+        self._lock_path = self._path.with_name(f"{self._path.name}.lock")
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Return the value for `key`, or `None` if missing."""
+        return self._load().get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store the value for `key`."""
+        with self._locked():
+            data = self._load()
+            data[key] = value
+            fd, tmp = tempfile.mkstemp(dir=self._path.parent, prefix=self._path.name)
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(tmp, self._path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the thread lock and, where supported, the inter-process lock."""
+        with self._lock:
+            try:
+                import fcntl
+            except ImportError:
+                yield
+                return
+            with self._lock_path.open("a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self) -> dict[str, Any]:
+        """Load the cache file."""
+        try:
+            with self._path.open(encoding="utf-8") as file:
+                return dict(json.load(file))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+
+class SQLiteCache(Cache):
+    """SQLite cache that survives restarts.
+
+    Unlike `FileCache`, a write only rewrites its own key, so it suits
+    sessions of many accounts. The database may be shared between processes.
+
+    It holds refresh tokens and AWS secret keys, so a new database is only
+    readable by its owner (mode 0600), as are the WAL files SQLite creates
+    next to it. The permissions of an existing database are kept.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        """Initialize."""
+        # SQLite creates the -wal and -shm files with the database's mode
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache"
+                " (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    def get(self, key: str) -> Any:
+        """Return the value for `key`, or `None` if missing."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """Store the value for `key`."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?)", (key, json.dumps(value))
+            )
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+
+@dataclass
+class CachedResponse:
+    """Cached API response."""
+
+    data: Any
+    digest: bytes
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched: float = 0.0
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Return the headers for a conditional request."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Cache of parsed API responses per user and endpoint.
+
+    Responses are keyed by a user key, e.g. from `identity_key`, and the URL,
+    so one cache may be shared between accounts without one account seeing
+    another's devices. Responses younger than the endpoint's TTL are returned
+    without a request. Older ones are revalidated with `ETag`/`Last-Modified`
+    when the server provides them, and a response body whose digest matches
+    the cached one is not parsed again. Cached data is shared between callers
+    and must not be mutated.
+    """
+
+    def __init__(
+        self, ttls: Mapping[str, float] | None = None, default_ttl: float = 0
+    ) -> None:
+        """Initialize.
+
+        `ttls` maps endpoint prefixes, e.g. `device/device-service/user/devices`,
+        to a TTL in seconds. The longest matching prefix wins.
+        """
+        self._ttls = sorted((ttls or {}).items(), key=lambda item: -len(item[0]))
+        self._default_ttl = default_ttl
+        self._responses: dict[tuple[str, str], CachedResponse] = {}
+
+    def get(self, user: str, url: str) -> CachedResponse | None:
+        """Return the cached response of `user` for `url`."""
+        return self._responses.get((user, url))
+
+    def is_fresh(self, url: str, cached: CachedResponse) -> bool:
+        """Return whether `cached` is still within the TTL of `url`."""
+        ttl = next(
+            (ttl for prefix, ttl in self._ttls if url.startswith(prefix)),
+            self._default_ttl,
+        )
+        return time.monotonic() - cached.fetched < ttl
+
+    def update(
+        self,
+        user: str,
+        url: str,
+        content: bytes,
+        headers: Mapping[str, str],
+        parse: Callable[[], Any],
+    ) -> Any:
+        """Store a 200 response of `user` for `url` and return its data.
+
+        `parse` is only called if `content` differs from the cached body.
+        """
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        cached = self._responses.get((user, url))
+        if cached is None or cached.digest != digest:
+            cached = CachedResponse(parse(), digest)
+            self._responses[user, url] = cached
+        cached.etag = headers.get("ETag")
+        cached.last_modified = headers.get("Last-Modified")
+        cached.fetched = time.monotonic()
+        return cached.data
+
+    def touch(self, cached: CachedResponse) -> Any:
+        """Mark `cached` as revalidated (e.g. after a 304) and return its data."""
+        cached.fetched = time.monotonic()
+        return cached.data
+
+    def clear(self) -> None:
+        """Clear the cache."""
+        self._responses.clear()
+
+
+def tokens_key(username: str) -> str:
+    """Return the cache key for the tokens of `username`."""
+    return f"tokens:{username}"
+
+
+def jwks_key(user_pool_id: str) -> str:
+    """Return the cache key for the JSON Web Key Set of a user pool."""
+    return f"jwks:{user_pool_id}"
+
+
+def has_signing_keys(jwks: Mapping[str, Any] | None, *tokens: str | None) -> bool:
+    """Return whether `jwks` has the keys that signed all of `tokens`."""
+    if not jwks:
+        return False
+    import jwt
+
+    kids = {key.get("kid") for key in jwks.get("keys", ())}
+    try:
+        return all(
+            jwt.get_unverified_header(token or "").get("kid") in kids
+            for token in tokens
+        )
+    except jwt.PyJWTError:
+        return False
+
+
+def identity_key(id_token: str) -> str:
+    """Return the cache key for the identity of the user of `id_token`."""
+    import jwt
+
+    claims = jwt.decode(id_token, options={"verify_signature": False})
+    return f"identity:{claims['sub']}"
+
+
+def token_expiration(token: str) -> float:
+    """Return the expiration time of a JWT without verifying it."""
+    import jwt
+
+    return float(jwt.decode(token, options={"verify_signature": False})["exp"])
+
+
+def is_expired(
+    expiration: float | None, now: float, margin: float = EXPIRATION_MARGIN
+) -> bool:
+    """Return whether `expiration` is within `margin` seconds of `now`."""
+    return expiration is None or expiration - margin <= now
+
+
+def to_timestamp(value: datetime | float | int) -> float:
+    """Return a POSIX timestamp from a datetime or number."""
+    return value.timestamp() if isinstance(value, datetime) else float(value)
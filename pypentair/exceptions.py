@@ -7,3 +7,7 @@ class PentairApiException(Exception):
 
 class PentairAuthenticationError(PentairApiException):
     """To indicate there is an issue authenticating."""
+
+
+class PentairCircuitOpenError(PentairApiException):
+    """To indicate requests are rejected because the API is unhealthy."""
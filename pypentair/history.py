@@ -0,0 +1,293 @@
+"""Device telemetry history."""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Mapping
+from typing import Any, Final, NamedTuple
+
+from .utils import decode_fields
+
+DEFAULT_CAPACITY: Final = 10_000  # samples kept per device field in memory
+
+
+class Series(NamedTuple):
+    """Samples of one device field, oldest first."""
+
+    timestamps: array[float]
+    values: array[float]
+
+
+class Bucket(NamedTuple):
+    """Aggregate of the samples in one downsampling interval."""
+
+    start: float
+    mean: float
+    minimum: float
+    maximum: float
+    samples: int
+
+
+def numeric_fields(
+    device: Mapping[str, Any], fields: Iterable[str] | None = None
+) -> dict[str, float]:
+    """Return the decoded numeric fields of a device, keyed by field key."""
+    raw = device.get("fields") or {}
+    if fields is not None:
+        raw = {key: raw[key] for key in fields if key in raw}
+    return {
+        key: float(value)
+        for key, (_, value) in decode_fields(raw, device.get("deviceType")).items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+
+class History(ABC):
+    """Append-only store of numeric device fields over time.
+
+    Samples are kept per `deviceId` and field key (e.g. `s19`), and a sample
+    no newer than the last one recorded for the same field is ignored, so
+    the same poll can be recorded twice without duplicating it.
+    """
+
+    def __init__(self, fields: Iterable[str] | None = None) -> None:
+        """Initialize, recording only `fields` if given."""
+        self._fields = None if fields is None else tuple(fields)
+
+    def record_devices(self, devices: Iterable[Mapping[str, Any]]) -> None:
+        """Record the numeric fields of polled devices at their `lastReport`."""
+        for device in devices:
+            if last_report := device.get("lastReport"):
+                timestamp = last_report / 1000
+            else:
+                timestamp = time.time()
+            if values := numeric_fields(device, self._fields):
+                self.record(device["deviceId"], timestamp, values)
+
+    @abstractmethod
+    def record(
+        self, device_id: str, timestamp: float, values: Mapping[str, float]
+    ) -> None:
+        """Record field values of a device at `timestamp`."""
+
+    @abstractmethod
+    def query(
+        self,
+        device_id: str,
+        field: str,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> Series:
+        """Return the samples of a device field with `start <= timestamp <= end`."""
+
+    def downsample(
+        self,
+        device_id: str,
+        field: str,
+        interval: float,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> list[Bucket]:
+        """Aggregate the samples of a device field into `interval` second buckets."""
+        buckets: list[Bucket] = []
+        series = self.query(device_id, field, start, end)
+        group: list[float] = []
+        group_start = 0.0
+        for timestamp, value in zip(*series):
+            bucket_start = timestamp // interval * interval
+            if group and bucket_start != group_start:
+                buckets.append(_bucket(group_start, group))
+                group = []
+            group_start = bucket_start
+            group.append(value)
+        if group:
+            buckets.append(_bucket(group_start, group))
+        return buckets
+
+    def close(self) -> None:
+        """Release any resources held by the store."""
+
+
+def _bucket(start: float, values: list[float]) -> Bucket:
+    return Bucket(
+        start, sum(values) / len(values), min(values), max(values), len(values)
+    )
+
+
+class _Ring:
+    """Fixed-capacity ring buffer of timestamps and values."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.timestamps = array("d")
+        self.values = array("d")
+        self.head = 0  # index of the oldest sample once full
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getitem__(self, index: int) -> float:
+        """Return the `index`-th oldest timestamp, for bisecting."""
+        return self.timestamps[(self.head + index) % len(self.timestamps)]
+
+    def append(self, timestamp: float, value: float) -> None:
+        if len(self.timestamps) < self.capacity:
+            self.timestamps.append(timestamp)
+            self.values.append(value)
+            return
+        self.timestamps[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+
+    def last(self) -> float | None:
+        return self[len(self) - 1] if len(self) else None
+
+    def slice(self, first: int, last: int) -> Series:
+        """Return the samples from the `first` to before the `last` oldest."""
+        if first >= last:
+            return Series(array("d"), array("d"))
+        size = len(self)
+        begin = (self.head + first) % size
+        end = (self.head + last - 1) % size + 1
+        if begin < end:
+            return Series(self.timestamps[begin:end], self.values[begin:end])
+        return Series(
+            self.timestamps[begin:] + self.timestamps[:end],
+            self.values[begin:] + self.values[:end],
+        )
+
+
+class MemoryHistory(History):
+    """In-memory history keeping the last `capacity` samples of each field.
+
+    Each field is stored as two `array("d")` columns, 16 bytes per sample.
+    """
+
+    def __init__(
+        self, capacity: int = DEFAULT_CAPACITY, fields: Iterable[str] | None = None
+    ) -> None:
+        """Initialize."""
+        super().__init__(fields)
+        self._capacity = capacity
+        self._rings: dict[tuple[str, str], _Ring] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, device_id: str, timestamp: float, values: Mapping[str, float]
+    ) -> None:
+        """Record field values of a device at `timestamp`."""
+        with self._lock:
+            for field, value in values.items():
+                if (ring := self._rings.get((device_id, field))) is None:
+                    ring = self._rings[device_id, field] = _Ring(self._capacity)
+                if (last := ring.last()) is None or timestamp > last:
+                    ring.append(timestamp, value)
+
+    def query(
+        self,
+        device_id: str,
+        field: str,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> Series:
+        """Return the samples of a device field with `start <= timestamp <= end`."""
+        with self._lock:
+            if (ring := self._rings.get((device_id, field))) is None:
+                return Series(array("d"), array("d"))
+            first = 0 if start is None else bisect_left(ring, start)
+            last = len(ring) if end is None else bisect_right(ring, end)
+            return ring.slice(first, last)
+
+
+class SQLiteHistory(History):
+    """History persisted to an SQLite database."""
+
+    def __init__(
+        self, path: str | os.PathLike[str], fields: Iterable[str] | None = None
+    ) -> None:
+        """Initialize."""
+        super().__init__(fields)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS samples ("
+                " device_id TEXT NOT NULL,"
+                " field TEXT NOT NULL,"
+                " timestamp REAL NOT NULL,"
+                " value REAL NOT NULL,"
+                " PRIMARY KEY (device_id, field, timestamp)"
+                ") WITHOUT ROWID"
+            )
+
+    def record(
+        self, device_id: str, timestamp: float, values: Mapping[str, float]
+    ) -> None:
+        """Record field values of a device at `timestamp`."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO samples SELECT ?1, ?2, ?3, ?4 WHERE NOT EXISTS ("
+                " SELECT 1 FROM samples"
+                " WHERE device_id = ?1 AND field = ?2 AND timestamp >= ?3)",
+                [
+                    (device_id, field, timestamp, value)
+                    for field, value in values.items()
+                ],
+            )
+
+    def query(
+        self,
+        device_id: str,
+        field: str,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> Series:
+        """Return the samples of a device field with `start <= timestamp <= end`."""
+        timestamps, values = array("d"), array("d")
+        with self._lock:
+            for timestamp, value in self._db.execute(
+                "SELECT timestamp, value FROM samples"
+                " WHERE device_id = ? AND field = ? AND timestamp BETWEEN ? AND ?"
+                " ORDER BY timestamp",
+                (device_id, field, *_bounds(start, end)),
+            ):
+                timestamps.append(timestamp)
+                values.append(value)
+        return Series(timestamps, values)
+
+    def downsample(
+        self,
+        device_id: str,
+        field: str,
+        interval: float,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> list[Bucket]:
+        """Aggregate the samples of a device field into `interval` second buckets."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT CAST(timestamp / ?1 AS INTEGER) * ?1 AS bucket,"
+                " avg(value), min(value), max(value), count(*) FROM samples"
+                " WHERE device_id = ?2 AND field = ?3 AND timestamp BETWEEN ?4 AND ?5"
+                " GROUP BY bucket ORDER BY bucket",
+                (interval, device_id, field, *_bounds(start, end)),
+            ).fetchall()
+        return [Bucket(*row) for row in rows]
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+
+def _bounds(start: float | None, end: float | None) -> tuple[float, float]:
+    return (
+        float("-inf") if start is None else start,
+        float("inf") if end is None else end,
+    )
@@ -0,0 +1,178 @@
+"""Request instrumentation."""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Final
+
+PHASE_AUTH: Final = "auth"
+PHASE_SIGN: Final = "sign"
+PHASE_NETWORK: Final = "network"
+PHASE_PARSE: Final = "parse"
+
+REFRESH_TOKENS: Final = "tokens"
+REFRESH_CREDENTIALS: Final = "credentials"
+
+# 0.1 ms doubling up to ~52 s
+DEFAULT_BUCKETS: Final = tuple(0.0001 * 2**exponent for exponent in range(20))
+
+
+class Instrumentation:
+    """Hooks called by the clients on the request path.
+
+    The default implementation does nothing; override the hooks you need.
+    Hooks are called synchronously and should be cheap.
+    """
+
+    def on_phase(self, phase: str, duration: float) -> None:
+        """Record the duration of a request phase.
+
+        Phases are `auth` (token check and credential exchange), `sign`,
+        `network` (send and download) and `parse`.
+        """
+
+    def on_request(
+        self,
+        method: str,
+        url: str,
+        status_code: int,
+        duration: float,
+        bytes_sent: int,
+        bytes_received: int,
+    ) -> None:
+        """Record a completed request."""
+
+    def on_retry(self, method: str, url: str, attempt: int) -> None:
+        """Record a retried request."""
+
+    def on_credential_refresh(self, kind: str) -> None:
+        """Record a refresh of the Cognito `tokens` or AWS `credentials`."""
+
+
+class Histogram:
+    """Fixed-bucket histogram."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Initialize."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a value."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, percent: float) -> float:
+        """Return an upper bound of the given percentile."""
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return (
+                    min(self.max, self.buckets[index])
+                    if index < len(self.buckets)
+                    else self.max
+                )
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the histogram as plain data."""
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        buckets.append((float("inf"), self.count))
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+class MetricsCollector(Instrumentation):
+    """In-memory metrics collector.
+
+    `snapshot()` returns plain data, with cumulative `(upper bound, count)`
+    histogram buckets, that can be handed to any metrics exporter.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Initialize."""
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._phases: dict[str, Histogram] = {}
+        self._requests = Histogram(buckets)
+        self._status_codes: Counter[int] = Counter()
+        self._counters: Counter[str] = Counter()
+
+    def on_phase(self, phase: str, duration: float) -> None:
+        """Record the duration of a request phase."""
+        with self._lock:
+            if (histogram := self._phases.get(phase)) is None:
+                histogram = self._phases[phase] = Histogram(self._buckets)
+            histogram.observe(duration)
+
+    def on_request(
+        self,
+        method: str,
+        url: str,
+        status_code: int,
+        duration: float,
+        bytes_sent: int,
+        bytes_received: int,
+    ) -> None:
+        """Record a completed request."""
+        with self._lock:
+            self._requests.observe(duration)
+            self._status_codes[status_code] += 1
+            self._counters["bytes_sent"] += bytes_sent
+            self._counters["bytes_received"] += bytes_received
+
+    def on_retry(self, method: str, url: str, attempt: int) -> None:
+        """Record a retried request."""
+        with self._lock:
+            self._counters["retries"] += 1
+
+    def on_credential_refresh(self, kind: str) -> None:
+        """Record a refresh of the Cognito tokens or AWS credentials."""
+        with self._lock:
+            self._counters[f"{kind}_refreshes"] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the collected metrics as plain data."""
+        with self._lock:
+            return {
+                "requests": self._requests.snapshot(),
+                "phases": {
+                    phase: histogram.snapshot()
+                    for phase, histogram in self._phases.items()
+                },
+                "status_codes": dict(self._status_codes),
+                "counters": dict(self._counters),
+            }
+
+    def reset(self) -> None:
+        """Reset the collected metrics."""
+        with self._lock:
+            self._phases.clear()
+            self._requests = Histogram(self._buckets)
+            self._status_codes.clear()
+            self._counters.clear()
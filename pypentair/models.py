@@ -0,0 +1,152 @@
+"""Device models."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+from datetime import datetime, timezone
+from typing import Any, TypeVar, cast
+
+from .schedule import Schedule
+from .utils import decode_fields
+
+_DeviceT = TypeVar("_DeviceT", bound=type["Device"])
+
+DEVICE_TYPES: dict[str, type[Device]] = {}
+
+
+def register(*device_types: str) -> Callable[[_DeviceT], _DeviceT]:
+    """Register a device model for the given `deviceType` values."""
+
+    def decorator(cls: _DeviceT) -> _DeviceT:
+        for device_type in device_types:
+            DEVICE_TYPES[device_type] = cls
+        return cls
+
+    return decorator
+
+
+def device_from_dict(data: Mapping[str, Any]) -> Device:
+    """Return the device model for a raw device dict."""
+    return DEVICE_TYPES.get(data.get("deviceType", ""), Device)(data)
+
+
+class Device:
+    """Pentair device.
+
+    Only the commonly used attributes and the raw `fields` are kept from the
+    API response. `fields` are decoded on first access.
+    """
+
+    __slots__ = (
+        "device_id",
+        "device_type",
+        "address_id",
+        "status",
+        "product_name",
+        "nickname",
+        "model",
+        "online",
+        "last_report",
+        "firmware_version",
+        "raw_fields",
+        "_fields",
+    )
+
+    def __init__(self, data: Mapping[str, Any]) -> None:
+        """Initialize."""
+        product_info = data.get("productInfo") or {}
+        self.device_id: str = data["deviceId"]
+        self.device_type: str = data.get("deviceType", "")
+        self.address_id: str | None = data.get("addressId")
+        self.status: str | None = data.get("status")
+        self.product_name: str | None = data.get("pname")
+        self.nickname: str | None = product_info.get("nickName")
+        self.model: str | None = product_info.get("model")
+        self.online: bool = bool(data.get("online"))
+        self.last_report: int | None = data.get("lastReport")
+        self.firmware_version: str | None = data.get("currentFWVersion")
+        self.raw_fields: Mapping[str, Any] = data.get("fields") or {}
+        self._fields: dict[str, tuple[str, Any]] | None = None
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"{type(self).__name__}(device_id={self.device_id!r}, nickname={self.nickname!r})"
+
+    @property
+    def fields(self) -> dict[str, tuple[str, Any]]:
+        """Return the decoded fields as `key -> (name, value)`."""
+        if self._fields is None:
+            self._fields = decode_fields(self.raw_fields, self.device_type)
+        return self._fields
+
+    @property
+    def last_report_time(self) -> datetime | None:
+        """Return the time of the last report."""
+        if self.last_report is None:
+            return None
+        return datetime.fromtimestamp(self.last_report / 1000, timezone.utc)
+
+    def get_value(self, key: str, default: Any = None) -> Any:
+        """Return the decoded value of a field."""
+        if (field := self.fields.get(key)) is None:
+            return default
+        return field[1]
+
+
+@register("SSS1")
+class SaltLevelSensor(Device):
+    """Salt level sensor."""
+
+    __slots__ = ()
+
+    @property
+    def salt_level(self) -> int | None:
+        """Return the salt level."""
+        return cast(int | None, self.get_value("salt_level"))
+
+    @property
+    def average_salt_usage_per_day(self) -> float | None:
+        """Return the average salt usage per day."""
+        return cast(float | None, self.get_value("average_salt_usage_per_day"))
+
+    @property
+    def battery_level(self) -> int | None:
+        """Return the battery level."""
+        return cast(int | None, self.get_value("battery_level"))
+
+
+@register("IF31")
+class IntelliFloPump(Device):
+    """IntelliFlo variable speed pump."""
+
+    __slots__ = ()
+
+    @property
+    def device_time(self) -> datetime | None:
+        """Return the device time."""
+        return cast(datetime | None, self.get_value("s1"))
+
+    @property
+    def pressure(self) -> float | None:
+        """Return the current pressure (psi)."""
+        return cast(float | None, self.get_value("s17"))
+
+    @property
+    def power(self) -> int | None:
+        """Return the current power (watts)."""
+        return cast(int | None, self.get_value("s18"))
+
+    @property
+    def motor_speed(self) -> float | None:
+        """Return the current motor speed (%)."""
+        return cast(float | None, self.get_value("s19"))
+
+    @property
+    def flow(self) -> float | None:
+        """Return the current estimated flow (gallons per minute)."""
+        return cast(float | None, self.get_value("s26"))
+
+    @property
+    def schedule(self) -> Schedule:
+        """Return the schedule of the pump programs."""
+        return Schedule.from_fields(self.raw_fields)
@@ -2,32 +2,114 @@
 
 from __future__ import annotations
 
+import json
 import logging
-from typing import Any, Final
+import threading
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Final
 from urllib.parse import urljoin
 
 import requests
-from boto3 import client as boto_client
-from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
 from botocore.credentials import Credentials
 from botocore.exceptions import ClientError
-from pycognito import Cognito
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from .aws import get_client
+from .cache import (
+    EXPIRATION_MARGIN,
+    Cache,
+    MemoryCache,
+    ResponseCache,
+    has_signing_keys,
+    identity_key,
+    is_expired,
+    jwks_key,
+    to_timestamp,
+    token_expiration,
+    tokens_key,
+)
 from .const import CLIENT_ID, IDENTITY_POOL_ID, REGION_NAME, USER_POOL_ID
 from .exceptions import PentairAuthenticationError
-from .utils import decode, redact
+from .instrumentation import (
+    PHASE_AUTH,
+    PHASE_NETWORK,
+    PHASE_PARSE,
+    PHASE_SIGN,
+    REFRESH_CREDENTIALS,
+    REFRESH_TOKENS,
+    Instrumentation,
+)
+from .models import device_from_dict
+from .resilience import (
+    BACKOFF_FACTOR,
+    RETRY_STATUSES,
+    CircuitBreaker,
+    JitterRetry,
+    TokenBucket,
+)
+from .signer import Signer
+from .utils import JSONArrayParser, LazyRedact, decode, json_loads
+
+if TYPE_CHECKING:
+    from pycognito import Cognito
 
 _LOGGER = logging.getLogger(__name__)
 
 BASE_URL: Final = "https://api.pentair.cloud/"
+DEFAULT_POOL_MAXSIZE: Final = 10
+DEFAULT_RETRIES: Final = 2
+DEFAULT_TIMEOUT: Final = 10
+DEVICE_URL: Final = "device/device-service/user/device/{device_id}"
+DEVICES_URL: Final = "device/device-service/user/devices"
+STREAM_CHUNK_SIZE: Final = 64 * 1024
+
+
+def create_session(
+    *, pool_maxsize: int = DEFAULT_POOL_MAXSIZE, retries: int | Retry = DEFAULT_RETRIES
+) -> requests.Session:
+    """Create a connection-pooled, keep-alive session.
+
+    The session may be shared between multiple `Pentair` instances so that
+    many accounts reuse the same sockets to the Pentair cloud.
+
+    GET requests failing with 429 or 5xx are retried up to `retries` times
+    with jittered exponential backoff, or after the `Retry-After` delay.
+    """
+    if not isinstance(retries, Retry):
+        retries = JitterRetry(
+            total=retries,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+    adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retries)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@dataclass
+class DeviceBatchResult:
+    """Devices fetched by id, with the errors of those that failed."""
+
+    devices: dict[str, Any] = field(default_factory=dict)
+    errors: dict[str, Exception] = field(default_factory=dict)
 
 
 class Pentair:
     """Pentair account."""
 
     _user: Cognito | None = None
-    _auth: SigV4Auth | None = None
+    _auth: Signer | None = None
+    _expiration: float | None = None
+    _token_expiration: float | None = None
 
     def __init__(
         self,
@@ -36,12 +118,94 @@ class Pentair:
         access_token: str | None = None,
         id_token: str | None = None,
         refresh_token: str | None = None,
+        session: requests.Session | None = None,
+        timeout: float | tuple[float, float] = DEFAULT_TIMEOUT,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        retries: int | Retry = DEFAULT_RETRIES,
+        rate_limiter: TokenBucket | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        cache: Cache | None = None,
+        response_cache: ResponseCache | None = None,
+        base_url: str = BASE_URL,
+        aws_endpoint_url: str | None = None,
+        instrumentation: Instrumentation | None = None,
     ) -> None:
-        """Initialize."""
+        """Initialize.
+
+        If `session` is provided it is used as-is and is not closed by
+        `close()`, otherwise a pooled session is created using `pool_maxsize`
+        and `retries`.
+
+        Requests wait for `rate_limiter` and fail fast with
+        `PentairCircuitOpenError` while `circuit_breaker` is open. Share them
+        between accounts for global limits.
+
+        The identity id, temporary AWS credentials and the user pool's JSON
+        Web Key Set are stored in `cache`, which defaults to an in-memory
+        cache for this instance. With a `username`, the tokens are stored
+        too, and restored from it when none are given, so a restart with a
+        persistent cache such as `SQLiteCache` needs no Cognito calls while
+        the tokens and credentials are valid.
+
+        GET responses are cached in `response_cache`, if provided. It is keyed
+        by user, so it may be shared between accounts.
+
+        `base_url` and `aws_endpoint_url` (used for both Cognito services)
+        allow pointing the client at another deployment or a local stand-in.
+
+        Request phase timings, sizes, status codes, retries and credential
+        refreshes are reported to `instrumentation`, if provided.
+
+        An instance may be shared between threads. The Cognito user is
+        created, and tokens and credentials are refreshed, by one thread at a
+        time while the others wait for and reuse its result.
+        """
+        self._cache = cache or MemoryCache()
+        if username and not (access_token or id_token or refresh_token):
+            tokens = self._cache.get(tokens_key(username)) or {}
+            access_token = tokens.get("access_token")
+            id_token = tokens.get("id_token")
+            refresh_token = tokens.get("refresh_token")
         self._username = username
         self._access_token = access_token
         self._id_token = id_token
         self._refresh_token = refresh_token
+        self._timeout = timeout
+        self._pool_maxsize = pool_maxsize
+        self._rate_limiter = rate_limiter
+        self._circuit_breaker = circuit_breaker
+        self._response_cache = response_cache
+        self._base_url = base_url
+        self._aws_endpoint_url = aws_endpoint_url
+        self._instrumentation = instrumentation or Instrumentation()
+        self._owns_session = session is None
+        self._session = session or create_session(
+            pool_maxsize=pool_maxsize, retries=retries
+        )
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> Pentair:
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit the runtime context and close the session."""
+        self.close()
+
+    @property
+    def session(self) -> requests.Session:
+        """Return the HTTP session."""
+        return self._session
+
+    def close(self) -> None:
+        """Close the HTTP session if it is owned by this instance."""
+        if self._owns_session:
+            self._session.close()
 
     @property
     def access_token(self) -> str | None:
@@ -60,44 +224,102 @@ class Pentair:
 
     def get_user(self) -> Cognito:
         """Return the Cognito user."""
-        if self._user is None:
-            self._user = Cognito(
+        if (user := self._user) is not None:
+            return user
+        with self._lock:
+            if (user := self._user) is not None:
+                return user
+            from pycognito import Cognito
+
+            user = Cognito(
                 decode(USER_POOL_ID),
                 decode(CLIENT_ID),
                 username=self._username,
                 access_token=self.access_token,
                 id_token=self.id_token,
                 refresh_token=self.refresh_token,
+                boto3_client_kwargs=(
+                    {"endpoint_url": self._aws_endpoint_url}
+                    if self._aws_endpoint_url
+                    else None
+                ),
             )
             if self.access_token or self.id_token:
+                jwks = self._cache.get(jwks_key(user.user_pool_id))
+                if has_signing_keys(jwks, user.id_token, user.access_token):
+                    user.pool_jwk = jwks
                 try:
-                    self._user.check_token()
-                    self._user.verify_tokens()
+                    user.check_token()
+                    user.verify_tokens()
                 except ClientError as err:
                     _LOGGER.error(err)
                     raise PentairAuthenticationError(err) from err
-        return self._user
+                if user.pool_jwk and user.pool_jwk is not jwks:
+                    self._cache.set(jwks_key(user.user_pool_id), user.pool_jwk)
+                self._save_tokens(user)
+            self._user = user
+            return user
 
-    def get_auth(self) -> SigV4Auth:
-        """Return the SigV4Auth."""
-        if self.get_user().check_token() or self._auth is None:
-            client = boto_client("cognito-identity", region_name=REGION_NAME)
-            logins = {
-                f"cognito-idp.{REGION_NAME}.amazonaws.com/{decode(USER_POOL_ID)}": self.id_token
-            }
-            response = client.get_id(
-                IdentityPoolId=decode(IDENTITY_POOL_ID), Logins=logins
+    def _save_tokens(self, user: Cognito) -> None:
+        """Store the tokens of `user` in the cache, if it has a username."""
+        if self._username:
+            self._cache.set(
+                tokens_key(self._username),
+                {
+                    "access_token": user.access_token,
+                    "id_token": user.id_token,
+                    "refresh_token": user.refresh_token,
+                },
             )
-            response = client.get_credentials_for_identity(
-                IdentityId=response["IdentityId"], Logins=logins
-            )
-            credentials = Credentials(
-                response["Credentials"]["AccessKeyId"],
-                response["Credentials"]["SecretKey"],
-                response["Credentials"]["SessionToken"],
-            )
-            self._auth = SigV4Auth(credentials, "execute-api", REGION_NAME)
-        return self._auth
+
+    def get_auth(self) -> Signer:
+        """Return the request signer.
+
+        The identity credentials are reused until shortly before they expire.
+        """
+        if (auth := self._valid_auth()) is not None:
+            return auth
+        with self._lock:
+            # another thread may have refreshed while this one waited
+            if (auth := self._valid_auth()) is not None:
+                return auth
+            user = self.get_user()
+            if user.check_token():
+                self._instrumentation.on_credential_refresh(REFRESH_TOKENS)
+                self._save_tokens(user)
+            self._token_expiration = token_expiration(user.access_token)
+            if self._auth is None or is_expired(self._expiration, time.time()):
+                self._auth = Signer(self._get_credentials())
+            return self._auth
+
+    def _valid_auth(self) -> Signer | None:
+        """Return the signer if its tokens and credentials are still valid."""
+        now = time.time()
+        if (
+            (auth := self._auth) is not None
+            and not is_expired(self._token_expiration, now, 0)
+            and not is_expired(self._expiration, now)
+        ):
+            return auth
+        return None
+
+    def refresh(self, margin: float = EXPIRATION_MARGIN) -> float:
+        """Refresh the tokens and identity credentials expiring within `margin`.
+
+        Returns the time at which the first of them expires, so the next
+        refresh can be scheduled ahead of it.
+        """
+        with self._lock:
+            user = self.get_user()
+            now = time.time()
+            if is_expired(token_expiration(user.access_token), now, margin):
+                user.renew_access_token()
+                self._instrumentation.on_credential_refresh(REFRESH_TOKENS)
+                self._save_tokens(user)
+            self._token_expiration = token_expiration(user.access_token)
+            if self._auth is None or is_expired(self._expiration, now, margin):
+                self._auth = Signer(self._get_credentials(margin))
+            return min(self._token_expiration, self._expiration or now)
 
     def get_tokens(self) -> dict[str, str]:
         """Return the tokens."""
@@ -111,54 +333,256 @@ class Pentair:
 
     def authenticate(self, password: str) -> None:
         """Authenticate a user."""
-        try:
-            self.get_user().authenticate(password=password)
-        except ClientError as err:
-            _LOGGER.error(err)
-            raise PentairAuthenticationError(err) from err
+        with self._lock:
+            try:
+                (user := self.get_user()).authenticate(password=password)
+            except ClientError as err:
+                _LOGGER.error(err)
+                raise PentairAuthenticationError(err) from err
+            self._save_tokens(user)
+            self._auth = self._token_expiration = None
 
     def logout(self) -> None:
         """Logout of all clients (including app)."""
-        self.get_user().logout()
+        with self._lock:
+            (user := self.get_user()).logout()
+            self._save_tokens(user)
+            self._auth = self._token_expiration = None
 
-    def get_device(self, device_id: str) -> Any:
-        """Get device."""
-        return self.__get(f"device/device-service/user/device/{device_id}")
+    def get_device(self, device_id: str, *, raw: bool = False) -> Any:
+        """Get device, as the unparsed JSON body if `raw`."""
+        return self.__get(DEVICE_URL.format(device_id=device_id), raw=raw)
 
-    def get_devices(self) -> Any:
-        """Get devices."""
-        return self.__get("device/device-service/user/devices")
+    def update_device(self, device_id: str, fields: Mapping[str, Any]) -> Any:
+        """Update device fields, e.g. `{"zp1e10": "0"}` to disable program 1."""
+        return self.__post(
+            DEVICE_URL.format(device_id=device_id), {"payload": dict(fields)}
+        )
 
-    def __request(self, method: str, url: str, **kwargs: Any) -> Any:
-        """Make a request."""
-        _LOGGER.debug("Making %s request to %s with %s", method, url, redact(kwargs))
+    def get_devices(self, *, raw: bool = False) -> Any:
+        """Get devices, as the unparsed JSON body if `raw`."""
+        return self.__get(DEVICES_URL, raw=raw)
 
-        request = AWSRequest(
-            method=method,
-            url=urljoin(BASE_URL, url),
-            headers={"x-amz-id-token": self.id_token},
-        )
-        self.get_auth().add_auth(request)
-        prepped = request.prepare()
-        response = requests.request(
-            method, prepped.url, headers=prepped.headers, timeout=10, **kwargs
+    def get_devices_by_id(
+        self, device_ids: Iterable[str], *, concurrency: int | None = None
+    ) -> DeviceBatchResult:
+        """Get several devices concurrently.
+
+        Credentials are obtained once before at most `concurrency` requests
+        are made at a time over the pooled session, by default as many as
+        the pool's `pool_maxsize` connections. Devices are returned in
+        the order of `device_ids`, and a failed device is reported in
+        `errors` instead of failing the batch.
+        """
+        device_ids = list(dict.fromkeys(device_ids))
+        result = DeviceBatchResult()
+        if not device_ids:
+            return result
+        self.get_auth()
+
+        def get(device_id: str) -> tuple[str, Any, Exception | None]:
+            try:
+                return device_id, self.get_device(device_id), None
+            except Exception as ex:  # pylint: disable=broad-except
+                return device_id, None, ex
+
+        with ThreadPoolExecutor(
+            min(concurrency or self._pool_maxsize, len(device_ids)),
+            thread_name_prefix="pypentair-batch",
+        ) as executor:
+            for device_id, device, error in executor.map(get, device_ids):
+                if error is None:
+                    result.devices[device_id] = device
+                else:
+                    result.errors[device_id] = error
+        return result
+
+    def iter_devices(self, *, models: bool = False) -> Iterator[Any]:
+        """Iterate over the devices as the response body is received.
+
+        Unlike `get_devices()`, neither the whole body nor the list of all
+        devices is held in memory. Devices are yielded as `Device` models if
+        `models` is set. The request is made when iteration starts.
+        """
+        response = self.__request("get", DEVICES_URL, stream=True)
+        with response:
+            parser = JSONArrayParser()
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                for device in parser.feed(chunk):
+                    yield device_from_dict(device) if models else device
+            for device in parser.close():
+                yield device_from_dict(device) if models else device
+
+    def _get_credentials(self, margin: float = EXPIRATION_MARGIN) -> Credentials:
+        """Return the identity credentials from the cache or Cognito."""
+        key = identity_key(str(self.id_token))
+        cached = self._cache.get(key) or {}
+        credentials = cached.get("credentials")
+        if credentials is None or is_expired(
+            credentials["expiration"], time.time(), margin
+        ):
+            self._instrumentation.on_credential_refresh(REFRESH_CREDENTIALS)
+            client = get_client("cognito-identity", endpoint_url=self._aws_endpoint_url)
+            logins = {
+                f"cognito-idp.{REGION_NAME}.amazonaws.com/{decode(USER_POOL_ID)}": self.id_token
+            }
+            if (identity_id := cached.get("identity_id")) is None:
+                identity_id = client.get_id(
+                    IdentityPoolId=decode(IDENTITY_POOL_ID), Logins=logins
+                )["IdentityId"]
+            response = client.get_credentials_for_identity(
+                IdentityId=identity_id, Logins=logins
+            )
+            credentials = {
+                "access_key_id": response["Credentials"]["AccessKeyId"],
+                "secret_key": response["Credentials"]["SecretKey"],
+                "session_token": response["Credentials"]["SessionToken"],
+                "expiration": to_timestamp(response["Credentials"]["Expiration"]),
+            }
+            self._cache.set(
+                key, {"identity_id": identity_id, "credentials": credentials}
+            )
+        self._expiration = credentials["expiration"]
+        return Credentials(
+            credentials["access_key_id"],
+            credentials["secret_key"],
+            credentials["session_token"],
         )
 
-        json = response.json()
+    def __request(
+        self,
+        method: str,
+        url: str,
+        *,
+        stream: bool = False,
+        raw: bool = False,
+        **kwargs: Any,
+    ) -> Any:
+        """Make a request.
+
+        With `stream`, the unread `requests.Response` of a successful request
+        is returned instead of its data, and with `raw` its body as bytes. Both
+        bypass the response cache.
+        """
         _LOGGER.debug(
-            "Received %s response from %s: %s", response.status_code, url, redact(json)
+            "Making %s request to %s with %s", method, url, LazyRedact(kwargs)
+        )
+
+        cache = (
+            self._response_cache if method == "get" and not (stream or raw) else None
+        )
+        if cache is not None:
+            user_key = identity_key(str(self.id_token))
+            cached = cache.get(user_key, url)
+        else:
+            cached = None
+        if cache is not None and cached is not None and cache.is_fresh(url, cached):
+            _LOGGER.debug("Using cached response for %s", url)
+            return cached.data
+
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire()
+
+        instrumentation = self._instrumentation
+        start = time.perf_counter()
+        auth = self.get_auth()
+        signed = time.perf_counter()
+        instrumentation.on_phase(PHASE_AUTH, signed - start)
+
+        full_url = urljoin(self._base_url, url)
+        headers = {"x-amz-id-token": str(self.id_token)}
+        if (body := kwargs.get("data")) is not None:
+            headers["Content-Type"] = "application/json"
+        headers = auth.sign(method, full_url, headers, body or b"")
+        if cached is not None:
+            headers.update(cached.headers)
+        sent = time.perf_counter()
+        instrumentation.on_phase(PHASE_SIGN, sent - signed)
+
+        if (breaker := self._circuit_breaker) is not None:
+            breaker.before_request()
+        try:
+            response = self._session.request(
+                method,
+                full_url,
+                headers=headers,
+                timeout=self._timeout,
+                stream=stream,
+                **kwargs,
+            )
+        except requests.RequestException:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        received = time.perf_counter()
+        instrumentation.on_phase(PHASE_NETWORK, received - sent)
+        if retries := getattr(getattr(response.raw, "retries", None), "history", ()):
+            for attempt in range(1, len(retries) + 1):
+                instrumentation.on_retry(method, url, attempt)
+        status_code = response.status_code
+        if breaker is not None:
+            if status_code in RETRY_STATUSES:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+        bytes_sent = len(response.request.body or b"") if response.request else 0
+        if stream:
+            instrumentation.on_request(
+                method,
+                url,
+                status_code,
+                received - start,
+                bytes_sent,
+                int(response.headers.get("Content-Length") or 0),
+            )
+            if status_code >= 400:
+                with response:
+                    _LOGGER.error("Status: %s - %s", status_code, response.text)
+                    response.raise_for_status()
+            return response
+
+        if cache is not None and cached is not None and status_code == 304:
+            _LOGGER.debug("Cached response for %s is not modified", url)
+            json_data = cache.touch(cached)
+        elif cache is not None and status_code == 200:
+            json_data = cache.update(
+                user_key,
+                url,
+                response.content,
+                response.headers,
+                lambda: json_loads(response.content),
+            )
+        elif 200 <= status_code < 300 and (raw or response.content):
+            json_data = response.content if raw else json_loads(response.content)
+        else:
+            # error bodies are not necessarily JSON; they are logged as text
+            json_data = None
+        parsed = time.perf_counter()
+        instrumentation.on_phase(PHASE_PARSE, parsed - received)
+        instrumentation.on_request(
+            method,
+            url,
+            status_code,
+            parsed - start,
+            bytes_sent,
+            len(response.content or b""),
         )
-        if (status_code := response.status_code) != 200:
-            _LOGGER.error("Status: %s - %s", status_code, json)
+        if status_code == 304:
+            return json_data
+        if status_code >= 400:
+            _LOGGER.error("Status: %s - %s", status_code, response.text)
             response.raise_for_status()
-        return json
+
+        _LOGGER.debug(
+            "Received %s response from %s: %s", status_code, url, LazyRedact(json_data)
+        )
+        return json_data
 
     def __get(self, url: str, **kwargs: Any) -> Any:
         """Make a get request."""
         return self.__request("get", url, **kwargs)
 
-    def __post(  # pylint: disable=unused-private-member
-        self, url: str, **kwargs: Any
-    ) -> Any:
-        """Make a post request."""
-        return self.__request("post", url, **kwargs)
+    def __post(self, url: str, payload: Any, **kwargs: Any) -> Any:
+        """Make a post request with a JSON payload."""
+        return self.__request("post", url, data=json.dumps(payload).encode(), **kwargs)
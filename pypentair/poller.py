@@ -0,0 +1,218 @@
+"""Multi-account poller."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Union
+
+from .utils import call_callback, call_nonblocking
+
+if TYPE_CHECKING:
+    from .aio import AsyncPentair
+    from .pentair import Pentair
+
+_LOGGER = logging.getLogger(__name__)
+
+Account = Union["Pentair", "AsyncPentair"]
+
+
+@dataclass
+class PollResult:
+    """Result of polling one account."""
+
+    account: Account
+    devices: Any = None
+    error: Exception | None = None
+    latency: float = 0.0
+    lag: float = 0.0
+
+
+@dataclass
+class PollCycleStats:
+    """Statistics of one poll cycle."""
+
+    duration: float
+    lag: float
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def p50(self) -> float:
+        """Return the median request latency."""
+        return _percentile(self.latencies, 50)
+
+    @property
+    def p99(self) -> float:
+        """Return the 99th percentile request latency."""
+        return _percentile(self.latencies, 99)
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """Return the nearest-rank percentile of `values`."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+class Poller:
+    """Poll the devices of many accounts with bounded concurrency.
+
+    Each account is given a random, stable offset within `spread` of the
+    interval so requests are spread evenly instead of bursting at the start
+    of each cycle, and each request is further delayed by up to `jitter`
+    seconds. At most `concurrency` requests are in flight at once; blocking
+    `Pentair` accounts run on a dedicated thread pool of that size while
+    `AsyncPentair` accounts are awaited directly.
+    """
+
+    def __init__(
+        self,
+        accounts: Iterable[Account] = (),
+        *,
+        interval: float = 30,
+        concurrency: int = 10,
+        spread: float = 0.8,
+        jitter: float = 1,
+        on_result: Callable[[PollResult], Awaitable[None] | None] | None = None,
+        on_tokens: Callable[[Account, dict[str, str]], Awaitable[None] | None]
+        | None = None,
+        on_cycle: Callable[[PollCycleStats], Awaitable[None] | None] | None = None,
+    ) -> None:
+        """Initialize.
+
+        `on_tokens` is called whenever an account's tokens change, so they
+        can be persisted.
+        """
+        self._interval = interval
+        self._concurrency = concurrency
+        self._spread = spread
+        self._jitter = jitter
+        self._on_result = on_result
+        self._on_tokens = on_tokens
+        self._on_cycle = on_cycle
+        self._offsets: dict[Account, float] = {}
+        self._tokens: dict[Account, dict[str, str]] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._stopped = asyncio.Event()
+        for account in accounts:
+            self.add_account(account)
+
+    @property
+    def accounts(self) -> list[Account]:
+        """Return the polled accounts."""
+        return list(self._offsets)
+
+    def add_account(self, account: Account) -> None:
+        """Add an account to poll."""
+        self._offsets[account] = random.uniform(0, self._interval * self._spread)
+
+    def remove_account(self, account: Account) -> None:
+        """Stop polling an account."""
+        self._offsets.pop(account, None)
+        self._tokens.pop(account, None)
+
+    def stop(self) -> None:
+        """Stop running after the current cycle."""
+        self._stopped.set()
+
+    async def run(self) -> None:
+        """Poll every interval until stopped."""
+        self._stopped.clear()
+        scheduled = time.monotonic()
+        try:
+            while not self._stopped.is_set():
+                await self.poll_once(scheduled)
+                scheduled += self._interval
+                if (now := time.monotonic()) > scheduled:
+                    # skip missed cycles rather than running them back to back
+                    missed = math.ceil((now - scheduled) / self._interval)
+                    _LOGGER.warning("Poll cycle overran, skipping %s cycle(s)", missed)
+                    scheduled += missed * self._interval
+                try:
+                    await asyncio.wait_for(
+                        self._stopped.wait(), scheduled - time.monotonic()
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Shut down the thread pool used for blocking accounts."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def poll_once(self, scheduled: float | None = None) -> PollCycleStats:
+        """Poll all accounts once and return the cycle statistics."""
+        start = time.monotonic()
+        scheduled = start if scheduled is None else scheduled
+        semaphore = asyncio.Semaphore(self._concurrency)
+        results = await asyncio.gather(
+            *(
+                self._poll(account, offset, scheduled, semaphore)
+                for account, offset in list(self._offsets.items())
+            )
+        )
+        stats = PollCycleStats(
+            duration=time.monotonic() - start,
+            lag=max((result.lag for result in results), default=0.0),
+            latencies=[result.latency for result in results],
+            errors=sum(1 for result in results if result.error is not None),
+        )
+        _LOGGER.debug(
+            "Polled %s accounts in %.3fs (p50 %.3fs, p99 %.3fs, lag %.3fs, %s errors)",
+            len(results),
+            stats.duration,
+            stats.p50,
+            stats.p99,
+            stats.lag,
+            stats.errors,
+        )
+        await call_callback(self._on_cycle, stats)
+        return stats
+
+    async def _poll(
+        self,
+        account: Account,
+        offset: float,
+        scheduled: float,
+        semaphore: asyncio.Semaphore,
+    ) -> PollResult:
+        """Poll one account."""
+        target = scheduled + offset + random.uniform(0, self._jitter)
+        if (delay := target - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+        async with semaphore:
+            result = PollResult(account, lag=max(0.0, time.monotonic() - target))
+            start = time.monotonic()
+            try:
+                result.devices = await self._call_account(account, "get_devices")
+                tokens = await self._call_account(account, "get_tokens")
+            except Exception as ex:  # pylint: disable=broad-except
+                _LOGGER.error("Error polling account: %s", ex)
+                result.error = ex
+            else:
+                if tokens and tokens != self._tokens.get(account):
+                    if account in self._tokens:
+                        await call_callback(self._on_tokens, account, tokens)
+                    self._tokens[account] = tokens
+            result.latency = time.monotonic() - start
+        await call_callback(self._on_result, result)
+        return result
+
+    async def _call_account(self, account: Account, method: str) -> Any:
+        """Call a method of an account without blocking the event loop."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self._concurrency, thread_name_prefix="pypentair-poller"
+            )
+        return await call_nonblocking(getattr(account, method), executor=self._executor)
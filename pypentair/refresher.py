@@ -0,0 +1,120 @@
+"""Background token refresher."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Final
+
+from .poller import Account
+from .utils import call_callback, call_nonblocking
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MARGIN: Final = 600  # seconds before expiration to refresh
+DEFAULT_JITTER: Final = 120
+RETRY_INTERVAL: Final = 60
+
+
+class TokenRefresher:
+    """Refresh the tokens and identity credentials of accounts ahead of expiry.
+
+    Each account is refreshed a lead time of `margin` seconds plus a random
+    share of `jitter` before its access token or AWS credentials expire, so
+    many accounts do not refresh at once and requests never have to. The same
+    lead is passed to the account's `refresh()`, so every wake-up renews.
+    `margin` should exceed the margin requests use (five minutes) for the
+    request path to stay free of auth round trips. Blocking `Pentair`
+    accounts are refreshed on a worker thread.
+    """
+
+    def __init__(
+        self,
+        accounts: Iterable[Account] = (),
+        *,
+        margin: float = DEFAULT_MARGIN,
+        jitter: float = DEFAULT_JITTER,
+        on_tokens: Callable[[Account, dict[str, str]], Awaitable[None] | None]
+        | None = None,
+    ) -> None:
+        """Initialize.
+
+        `on_tokens` is called with an account's tokens after its first refresh
+        and whenever they change, so they can be persisted.
+        """
+        self._margin = margin
+        self._jitter = jitter
+        self._on_tokens = on_tokens
+        self._due: dict[Account, float] = {}
+        self._leads: dict[Account, float] = {}
+        self._tokens: dict[Account, dict[str, str]] = {}
+        self._changed = asyncio.Event()
+        self._stopped = asyncio.Event()
+        for account in accounts:
+            self.add_account(account)
+
+    @property
+    def accounts(self) -> list[Account]:
+        """Return the refreshed accounts."""
+        return list(self._due)
+
+    def add_account(self, account: Account) -> None:
+        """Add an account to refresh, starting immediately."""
+        self._due[account] = 0.0
+        self._leads[account] = self._margin
+        self._changed.set()
+
+    def remove_account(self, account: Account) -> None:
+        """Stop refreshing an account."""
+        self._due.pop(account, None)
+        self._leads.pop(account, None)
+        self._tokens.pop(account, None)
+
+    def stop(self) -> None:
+        """Stop running."""
+        self._stopped.set()
+
+    async def run(self) -> None:
+        """Refresh accounts as they become due until stopped."""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            await self.refresh_due()
+            self._changed.clear()
+            delay = min(self._due.values(), default=time.time() + 3600) - time.time()
+            waiters = {
+                asyncio.ensure_future(self._stopped.wait()),
+                asyncio.ensure_future(self._changed.wait()),
+            }
+            _, pending = await asyncio.wait(
+                waiters, timeout=max(0.0, delay), return_when=asyncio.FIRST_COMPLETED
+            )
+            for waiter in pending:
+                waiter.cancel()
+
+    async def refresh_due(self) -> None:
+        """Refresh the accounts that are due."""
+        now = time.time()
+        due = [account for account, when in list(self._due.items()) if when <= now]
+        await asyncio.gather(*(self._refresh(account) for account in due))
+
+    async def _refresh(self, account: Account) -> None:
+        """Refresh one account and schedule its next refresh."""
+        lead = self._leads.get(account, self._margin)
+        try:
+            expiration = await call_nonblocking(account.refresh, lead)
+            tokens = await call_nonblocking(account.get_tokens)
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.error("Error refreshing account: %s", ex)
+            due = time.time() + RETRY_INTERVAL
+        else:
+            lead = self._margin + random.uniform(0, self._jitter)
+            due = expiration - lead
+            if tokens and tokens != self._tokens.get(account):
+                self._tokens[account] = tokens
+                await call_callback(self._on_tokens, account, tokens)
+        if account in self._due:
+            self._due[account] = max(due, time.time() + 1)
+            self._leads[account] = lead
@@ -0,0 +1,143 @@
+"""Retries, rate limiting and circuit breaking."""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Final
+
+from urllib3.util.retry import Retry
+
+from .exceptions import PentairCircuitOpenError
+
+BACKOFF_FACTOR: Final = 0.5
+BACKOFF_MAX: Final = 30
+RETRY_STATUSES: Final = frozenset({429, 500, 502, 503, 504})
+
+
+class JitterRetry(Retry):
+    """urllib3 `Retry` with full jitter on the exponential backoff.
+
+    `Retry-After` headers on 429 and 503 responses take precedence over the
+    backoff, as with `Retry`.
+    """
+
+    def get_backoff_time(self) -> float:
+        """Return a random backoff of up to the exponential backoff time."""
+        return random.uniform(0, super().get_backoff_time())
+
+
+def backoff_time(
+    attempt: int, factor: float = BACKOFF_FACTOR, maximum: float = BACKOFF_MAX
+) -> float:
+    """Return a fully jittered exponential backoff for a 1-based `attempt`."""
+    return random.uniform(0, min(maximum, factor * 2 ** (attempt - 1)))
+
+
+def retry_after(value: str | None, now: float | None = None) -> float | None:
+    """Return the seconds to wait from a `Retry-After` header, if any."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Allows bursts of up to `capacity` requests and `rate` requests per second
+    on average. Share one bucket between accounts for a global limit.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        """Initialize."""
+        self._rate = rate
+        self._capacity = capacity or max(1.0, rate)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Take `tokens` and return the seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self._rate)
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Block until `tokens` are available."""
+        if delay := self.reserve(tokens):
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests fail fast with `PentairCircuitOpenError`. After `reset_timeout`
+    seconds a single trial request is let through; its success closes the
+    circuit and its failure opens it again. A trial without an outcome, e.g.
+    a cancelled request, is replaced by another after `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        """Initialize."""
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened: float | None = None
+        self._trial: float | None = None  # when the trial request was let through
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """Return whether requests are currently rejected."""
+        with self._lock:
+            return self._retry_in(time.monotonic()) > 0
+
+    def before_request(self) -> None:
+        """Raise `PentairCircuitOpenError` if the request must not be made."""
+        with self._lock:
+            if self._opened is None:
+                return
+            now = time.monotonic()
+            if (retry_in := self._retry_in(now)) > 0:
+                raise PentairCircuitOpenError(
+                    f"Pentair API is unavailable, retry in {retry_in:.0f}s"
+                )
+            self._trial = now
+
+    def record_success(self) -> None:
+        """Record a successful request."""
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+            self._trial = None
+
+    def record_failure(self) -> None:
+        """Record a failed request."""
+        with self._lock:
+            self._failures += 1
+            if self._trial is not None or self._failures >= self._failure_threshold:
+                self._opened = time.monotonic()
+            self._trial = None
+
+    def _retry_in(self, now: float) -> float:
+        """Return the seconds until the next request may be let through."""
+        if self._opened is None:
+            return 0.0
+        since = self._opened if self._trial is None else self._trial
+        return since + self._reset_timeout - now
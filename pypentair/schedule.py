@@ -0,0 +1,190 @@
+"""Pump program schedules."""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Final
+
+DAY: Final = 24 * 60  # minutes
+WEEK: Final = 7 * DAY
+
+_PROGRAM_FIELD: Final = re.compile(r"zp(\d+)e(\d+)")
+
+
+def _int(value: Any, default: int = 0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class Program:
+    """Pump program decoded from the `zp<number>e<element>` fields.
+
+    `start` (`e6`) is in minutes after midnight, `duration` (`e7`) in minutes
+    and `days` (`e8`) a bitmask of weekdays with bit 0 for Monday, as with
+    `datetime.weekday()`.
+    """
+
+    number: int
+    name: str | None = None
+    reference: Any = None
+    value: Any = None
+    type: Any = None
+    start: int = 0
+    duration: int = 0
+    days: int = 0
+    enabled: bool = False
+    exists: bool = True
+    relay_1: Any = None
+    relay_2: Any = None
+
+    @classmethod
+    def from_elements(cls, number: int, elements: Mapping[int, Any]) -> Program:
+        """Return the program from its fields, keyed by element number."""
+        return cls(
+            number,
+            name=elements.get(2),
+            reference=elements.get(3),
+            value=elements.get(4),
+            type=elements.get(5),
+            start=_int(elements.get(6)),
+            duration=_int(elements.get(7)),
+            days=_int(elements.get(8)),
+            enabled=_int(elements.get(10)) != 0,
+            exists=_int(elements.get(13), 1) != 0,
+            relay_1=elements.get(11),
+            relay_2=elements.get(12),
+        )
+
+    @property
+    def scheduled(self) -> bool:
+        """Return whether the program runs on a schedule."""
+        return self.enabled and self.exists and self.duration > 0 and self.days != 0
+
+
+def parse_programs(fields: Mapping[str, Any]) -> list[Program]:
+    """Return the programs in a device's `fields`, ordered by number."""
+    elements: dict[int, dict[int, Any]] = {}
+    for key, value in fields.items():
+        if key.startswith("zp") and (match := _PROGRAM_FIELD.fullmatch(key)):
+            elements.setdefault(int(match[1]), {})[int(match[2])] = value
+    return [
+        Program.from_elements(number, elements[number]) for number in sorted(elements)
+    ]
+
+
+class Schedule:
+    """Weekly schedule of pump programs.
+
+    The week is split once into segments between program starts and ends, so
+    the programs running at a time and the next transition are found by
+    bisecting the segment boundaries. Times are in the device's local time.
+    """
+
+    def __init__(self, programs: Iterable[Program]) -> None:
+        """Initialize."""
+        self.programs = tuple(programs)
+        intervals: list[tuple[int, int, Program]] = []
+        for program in self.programs:
+            if not program.scheduled:
+                continue
+            duration = min(program.duration, WEEK)
+            for day in range(7):
+                if program.days >> day & 1:
+                    start = day * DAY + program.start % DAY
+                    end = start + duration
+                    intervals.append((start, min(end, WEEK), program))
+                    if end > WEEK:
+                        intervals.append((0, end - WEEK, program))
+
+        boundaries = sorted({0, *(t for s, e, _ in intervals for t in (s, e))} - {WEEK})
+        self._times: list[int] = []
+        self._running: list[tuple[Program, ...]] = []
+        for time in boundaries:
+            running = tuple(
+                program for start, end, program in intervals if start <= time < end
+            )
+            if not self._running or running != self._running[-1]:
+                self._times.append(time)
+                self._running.append(running)
+        # boundaries where the running programs change, including across weeks
+        self._transitions = [
+            time
+            for index, time in enumerate(self._times)
+            if self._running[index] != self._running[index - 1]
+        ]
+
+    @classmethod
+    def from_fields(cls, fields: Mapping[str, Any]) -> Schedule:
+        """Return the schedule of the programs in a device's `fields`."""
+        return cls(parse_programs(fields))
+
+    def running(self, at: datetime) -> tuple[Program, ...]:
+        """Return the programs running at `at`."""
+        return self._running_at(_minute_of_week(at))
+
+    def next_transition(
+        self, at: datetime
+    ) -> tuple[datetime, tuple[Program, ...]] | None:
+        """Return when the running programs next change after `at`, and to what.
+
+        Returns `None` if they never change.
+        """
+        if not self._transitions:
+            return None
+        minute = _minute_of_week(at)
+        index = bisect_right(self._transitions, minute)
+        if index == len(self._transitions):
+            time = self._transitions[0] + WEEK
+        else:
+            time = self._transitions[index]
+        return at + timedelta(minutes=time - minute), self._running_at(time)
+
+    def _running_at(self, minute: float) -> tuple[Program, ...]:
+        """Return the programs running at a minute of the week."""
+        return self._running[bisect_right(self._times, minute % WEEK) - 1]
+
+
+def _minute_of_week(at: datetime) -> float:
+    return (
+        at.weekday() * DAY
+        + at.hour * 60
+        + at.minute
+        + (at.second + at.microsecond / 1e6) / 60
+    )
+
+
+class ScheduleCache:
+    """Schedules of polled devices, rebuilt only when their programs change."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._schedules: dict[str, tuple[Any, tuple[Any, ...], Schedule]] = {}
+
+    def get(self, device: Mapping[str, Any]) -> Schedule:
+        """Return the schedule of a device."""
+        device_id = device["deviceId"]
+        last_report = device.get("lastReport")
+        cached = self._schedules.get(device_id)
+        if cached is not None and last_report is not None and cached[0] == last_report:
+            return cached[2]
+        fields = device.get("fields") or {}
+        signature = tuple(
+            (key, value) for key, value in fields.items() if key.startswith("zp")
+        )
+        if cached is not None and cached[1] == signature:
+            schedule = cached[2]
+        else:
+            schedule = Schedule.from_fields(fields)
+        self._schedules[device_id] = (last_report, signature, schedule)
+        return schedule
+
+    def forget(self, device_id: str) -> None:
+        """Forget the schedule of a device."""
+        self._schedules.pop(device_id, None)
@@ -0,0 +1,124 @@
+"""AWS Signature Version 4 request signing."""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+from datetime import datetime, timezone
+from typing import Any, Final
+from urllib.parse import quote, urlsplit
+
+from botocore.auth import SigV4Auth
+from botocore.credentials import Credentials
+from botocore.utils import normalize_url_path
+
+from .const import REGION_NAME
+
+ALGORITHM: Final = "AWS4-HMAC-SHA256"
+EMPTY_SHA256: Final = hashlib.sha256(b"").hexdigest()
+SERVICE_NAME: Final = "execute-api"
+TIMESTAMP_FORMAT: Final = "%Y%m%dT%H%M%SZ"
+
+_DEFAULT_PORTS: Final = {"http": 80, "https": 443}
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+class Signer(SigV4Auth):
+    """SigV4 signer that caches the derived signing key.
+
+    The key only depends on the secret, date, region and service, so it is
+    derived once a day rather than once per request. `sign` builds the
+    canonical request straight from the outgoing method, URL and headers
+    instead of going through an `AWSRequest`.
+    """
+
+    def __init__(
+        self,
+        credentials: Credentials,
+        service_name: str = SERVICE_NAME,
+        region_name: str = REGION_NAME,
+    ) -> None:
+        """Initialize."""
+        super().__init__(credentials, service_name, region_name)
+        frozen = credentials.get_frozen_credentials()
+        self._access_key: str = frozen.access_key
+        self._secret_key: str = frozen.secret_key
+        self._token: str | None = frozen.token
+        self._signing_key: tuple[str, bytes] | None = None
+
+    def signing_key(self, date: str) -> bytes:
+        """Return the signing key for a `YYYYMMDD` date."""
+        if (cached := self._signing_key) is not None and cached[0] == date:
+            return cached[1]
+        key = _hmac(f"AWS4{self._secret_key}".encode(), date)
+        key = _hmac(key, self._region_name)
+        key = _hmac(key, self._service_name)
+        key = _hmac(key, "aws4_request")
+        self._signing_key = (date, key)
+        return key
+
+    def signature(self, string_to_sign: str, request: Any) -> str:
+        """Sign `string_to_sign` with the cached signing key."""
+        key = self.signing_key(request.context["timestamp"][0:8])
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def sign(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str] | None = None,
+        body: bytes = b"",
+        *,
+        now: datetime | None = None,
+    ) -> dict[str, str]:
+        """Return `headers` with the SigV4 date, token and authorization added."""
+        timestamp = (now or datetime.now(timezone.utc)).strftime(TIMESTAMP_FORMAT)
+        date = timestamp[0:8]
+        signed = dict(headers or {})
+        signed["X-Amz-Date"] = timestamp
+        if self._token:
+            signed["X-Amz-Security-Token"] = self._token
+
+        parts = urlsplit(url)
+        host = parts.hostname or ""
+        if parts.port is not None and parts.port != _DEFAULT_PORTS.get(parts.scheme):
+            host = f"{host}:{parts.port}"
+        canonical = {"host": host}
+        for name, value in signed.items():
+            canonical[name.lower()] = " ".join(str(value).split())
+        names = sorted(canonical)
+        signed_headers = ";".join(names)
+        query = ""
+        if parts.query:
+            pairs = sorted(pair.partition("=")[::2] for pair in parts.query.split("&"))
+            query = "&".join(f"{key}={value}" for key, value in pairs)
+        canonical_request = "\n".join(
+            (
+                method.upper(),
+                quote(normalize_url_path(parts.path), safe="/~"),
+                query,
+                "".join(f"{name}:{canonical[name]}\n" for name in names),
+                signed_headers,
+                hashlib.sha256(body).hexdigest() if body else EMPTY_SHA256,
+            )
+        )
+        scope = f"{date}/{self._region_name}/{self._service_name}/aws4_request"
+        string_to_sign = "\n".join(
+            (
+                ALGORITHM,
+                timestamp,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            )
+        )
+        signature = hmac.new(
+            self.signing_key(date), string_to_sign.encode(), hashlib.sha256
+        ).hexdigest()
+        signed["Authorization"] = (
+            f"{ALGORITHM} Credential={self._access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        return signed
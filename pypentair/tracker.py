@@ -0,0 +1,77 @@
+"""Device change tracking."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from typing import Any, NamedTuple
+
+from .utils import decode_fields
+
+_MISSING: Any = object()
+
+
+class FieldChange(NamedTuple):
+    """A changed device field."""
+
+    device_id: str
+    key: str
+    name: str
+    old: Any
+    new: Any
+
+
+class DeviceTracker:
+    """Track polled devices and report only the fields that changed.
+
+    Devices whose `lastReport` is unchanged since the previous update are
+    skipped without comparing their fields, and only changed fields are
+    decoded, so an update costs work proportional to the changes.
+    """
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._snapshots: dict[str, tuple[Any, Mapping[str, Any]]] = {}
+
+    def update(self, devices: Iterable[Mapping[str, Any]]) -> list[FieldChange]:
+        """Update the snapshots from `devices` and return the changed fields.
+
+        Fields of a device seen for the first time are reported with an `old`
+        value of `None`, and removed fields with a `new` value of `None`.
+        """
+        changes: list[FieldChange] = []
+        for device in devices:
+            device_id = device["deviceId"]
+            last_report = device.get("lastReport")
+            previous = self._snapshots.get(device_id)
+            if last_report is not None and previous and previous[0] == last_report:
+                continue
+            fields = device.get("fields") or {}
+            old_fields = previous[1] if previous else {}
+            self._snapshots[device_id] = (last_report, dict(fields))
+
+            changed = [
+                key
+                for key, value in fields.items()
+                if old_fields.get(key, _MISSING) != value
+            ]
+            changed.extend(key for key in old_fields if key not in fields)
+            if not changed:
+                continue
+
+            device_type = device.get("deviceType")
+            old = decode_fields(
+                {key: old_fields[key] for key in changed if key in old_fields},
+                device_type,
+            )
+            new = decode_fields(
+                {key: fields[key] for key in changed if key in fields}, device_type
+            )
+            for key in changed:
+                old_name, old_value = old.get(key, (key, None))
+                name, new_value = new.get(key, (old_name, None))
+                changes.append(FieldChange(device_id, key, name, old_value, new_value))
+        return changes
+
+    def forget(self, device_id: str) -> None:
+        """Forget the snapshot of a device."""
+        self._snapshots.pop(device_id, None)
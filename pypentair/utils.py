@@ -2,10 +2,15 @@
 
 from __future__ import annotations
 
+import codecs
+import json
 import logging
 from base64 import b64decode
-from collections.abc import Callable, Mapping
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import Executor
+from dataclasses import dataclass
 from datetime import datetime
+from functools import cache
 from typing import Any, Final, TypeVar, cast, overload
 
 _LOGGER = logging.getLogger(__name__)
@@ -16,6 +21,20 @@ REDACTED: Final = "**REDACTED**"
 REDACT_FIELDS: Final = ["arn", "deviceId", "email", "userId"]
 
 
+def _json_loads() -> tuple[str, Callable[[str | bytes], Any]]:
+    """Return the name and `loads` of the fastest available JSON backend."""
+    try:
+        import orjson
+    except ImportError:
+        return "json", json.loads
+    return "orjson", orjson.loads
+
+
+# orjson, if installed (`pypentair[fast]`), or the standard library.
+# Both raise a `ValueError` subclass on invalid JSON.
+JSON_BACKEND, json_loads = _json_loads()
+
+
 def decode(value: str) -> str:
     """Decode a value."""
     return b64decode(value).decode(ENCODING)
@@ -30,296 +49,439 @@ def redact(data: _T) -> _T: ...
 
 
 def redact(data: _T) -> _T:
-    """Redact sensitive data in a dict."""
-    if not isinstance(data, (Mapping, list)):
+    """Redact sensitive data in a dict.
+
+    Only the containers on the path to a redacted value are copied; subtrees
+    without any `REDACT_FIELDS` are returned as-is, so the result may share
+    objects with `data`.
+    """
+    if isinstance(data, (str, int, float)) or data is None:
         return data
 
     if isinstance(data, list):
-        return cast(_T, [redact(val) for val in data])
+        redacted_list: list | None = None
+        for index, value in enumerate(data):
+            if (new := redact(value)) is not value:
+                if redacted_list is None:
+                    redacted_list = list(data)
+                redacted_list[index] = new
+        return cast(_T, data if redacted_list is None else redacted_list)
 
-    redacted = {**data}
+    if not isinstance(data, Mapping):
+        return data
 
-    for key, value in redacted.items():
-        if value is None:
+    redacted: dict | None = None
+    for key, value in data.items():
+        if key in REDACT_FIELDS:
+            if value is None or value == "" or value == REDACTED:
+                continue
+            new = REDACTED
+        elif isinstance(value, (str, int, float)) or value is None:
             continue
-        if isinstance(value, str) and not value:
+        elif isinstance(value, (Mapping, list)):
+            if (new := redact(value)) is value:
+                continue
+        else:
             continue
-        if key in REDACT_FIELDS:
-            redacted[key] = REDACTED
-        elif isinstance(value, Mapping):
-            redacted[key] = redact(value)
-        elif isinstance(value, list):
-            redacted[key] = [redact(item) for item in value]
+        if redacted is None:
+            redacted = {**data}
+        redacted[key] = new
 
+    if redacted is None:
+        return cast(_T, data if isinstance(data, dict) else {**data})
     return cast(_T, redacted)
 
 
-def _divide_by_10(value: str | int | float) -> float:
-    """Divide a value by 10."""
-    return float(value) / 10
+class LazyRedact:
+    """Redact data only when formatted, e.g. when a log record is emitted."""
 
+    __slots__ = ("_data",)
 
-API_FIELD_NAME_MAP: Final[dict[str, str]] = {
-    "s1": "Device time",
-    "s2": "Finished good serial number",
-    "s3": "Drive type",
-    "s4": "Wet end type",
-    "s5": "Relay installed",
-    "s6": "Wifi mac address",
-    "s7": "Drive software version",
-    "s8": "IoT version",
-    "s9": "Controller version",
-    "s10": "UDM application software version",
-    "s11": "Security key",
-    "s12": "Checksum",
-    "s13": "RSSI",  # dBm
-    "s14": "Active program number",
-    "s15": "Active reference",
-    "s16": "Active value",
-    "s17": "Current pressure",  # psi
-    "s18": "Current power",  # watts
-    "s19": "Current motor speed",  # %
-    "s20": "Alarm condition",
-    "s21": "Relay 1 status",
-    "s22": "Relay 2 status",
-    "s23": "SSID",
-    "s24": "Digital inputs",
-    "s25": "Pump enabled status",
-    "s26": "Current estimated flow",  # gallons per minute
-    "s27": "Status word",
-    "s28": "Remaining time",
-    "s29": "Automation active",
-    "s30": "Active program relay 1",
-    "s31": "Active program relay 2",
-    "s32": "Relay 1 remaining time",
-    "s33": "Relay 2 remaining time",
-    "s42": "Drive hardware version",
-    "s43": "Comm board hardware version",
-    "s44": "UDM assets software version",
-    "s45": "UDM hardware version",
-    "s46": "Drive flow table version",
-    "s48": "Wifi level",
-    "s50": "Feature bit",
-    "d1": "Pump automation address",
-    "d2": "Max speed",
-    "d3": "Max flow",
-    "d4": "Max pressure",
-    "d5": "Priming speed",
-    "d6": "Priming range",
-    "d7": "Max priming duration",
-    "d8": "Loss of prime",
-    "d9": "Time source",
-    "d10": "Flow program pressure max",
-    "d11": "Thermal mode enable",
-    "d13": "Thermal mode temperature",
-    "d14": "Password protection scheme",
-    "d15": "Password",
-    "d16": "Daylight savings",
-    "d17": "Device time zone",
-    "d18": "Min speed",
-    "d19": "Min flow",
-    "d20": "Flow limit speed",
-    "d21": "Pressure limit speed",
-    "d22": "Priming enabled",
-    "d23": "Dry start",
-    "d24": "Priming delay",
-    "d25": "Pump start stop",
-    "d26": "Date provisioned",
-    "d27": "Pump nickname",
-    "d28": "Relay 1 name",
-    "d29": "Relay 1 flow dependent",
-    "d30": "Relay 2 name",
-    "d31": "Relay 2 flow dependent",
-    "d32": "Ramp rate up",
-    "d33": "Ramp rate down",
-    "d34": "Device resets",
-    "d35": "Ble always on",
-    "d36": "Relay 1 type",
-    "d37": "Relay 2 type",
-    "d38": "Booster pump delay",
-    "d42": "Timezone string",
-    "p1": "Setup complete flag",
-    "p2": "Last active program",
-    "1": "Pump type 1",
-    "2": "Pump type 2",
-    "zp1e1": "Program 1 id",
-    "zp1e2": "Program 1 name",
-    "zp1e3": "Program 1 reference",
-    "zp1e4": "Program 1 value",
-    "zp1e5": "Program 1 type",
-    "zp1e6": "Program 1 start time of day",
-    "zp1e7": "Program 1 duration",
-    "zp1e8": "Program 1 days to run",
-    "zp1e9": "Program 1 pump active",
-    "zp1e10": "Program 1 enable",
-    "zp1e11": "Program 1 relay 1",
-    "zp1e12": "Program 1 relay 2",
-    "zp1e13": "Program 1 exists",
-    "zp1e14": "Program 1 relay 1 light mode",
-    "zp1e15": "Program 1 relay 2 light mode",
-    "zp2e1": "Program 2 id",
-    "zp2e2": "Program 2 name",
-    "zp2e3": "Program 2 reference",
-    "zp2e4": "Program 2 value",
-    "zp2e5": "Program 2 type",
-    "zp2e6": "Program 2 start time of day",
-    "zp2e7": "Program 2 duration",
-    "zp2e8": "Program 2 days to run",
-    "zp2e9": "Program 2 pump active",
-    "zp2e10": "Program 2 enable",
-    "zp2e11": "Program 2 relay 1",
-    "zp2e12": "Program 2 relay 2",
-    "zp2e13": "Program 2 exists",
-    "zp2e14": "Program 2 relay 1 light mode",
-    "zp2e15": "Program 2 relay 2 light mode",
-    "zp3e1": "Program 3 id",
-    "zp3e2": "Program 3 name",
-    "zp3e3": "Program 3 reference",
-    "zp3e4": "Program 3 value",
-    "zp3e5": "Program 3 type",
-    "zp3e6": "Program 3 start time of day",
-    "zp3e7": "Program 3 duration",
-    "zp3e8": "Program 3 days to run",
-    "zp3e9": "Program 3 pump active",
-    "zp3e10": "Program 3 enable",
-    "zp3e11": "Program 3 relay 1",
-    "zp3e12": "Program 3 relay 2",
-    "zp3e13": "Program 3 exists",
-    "zp3e14": "Program 3 relay 1 light mode",
-    "zp3e15": "Program 3 relay 2 light mode",
-    "zp4e1": "Program 4 id",
-    "zp4e2": "Program 4 name",
-    "zp4e3": "Program 4 reference",
-    "zp4e4": "Program 4 value",
-    "zp4e5": "Program 4 type",
-    "zp4e6": "Program 4 start time of day",
-    "zp4e7": "Program 4 duration",
-    "zp4e8": "Program 4 days to run",
-    "zp4e9": "Program 4 pump active",
-    "zp4e10": "Program 4 enable",
-    "zp4e11": "Program 4 relay 1",
-    "zp4e12": "Program 4 relay 2",
-    "zp4e13": "Program 4 exists",
-    "zp4e14": "Program 4 relay 1 light mode",
-    "zp4e15": "Program 4 relay 2 light mode",
-    "zp5e1": "Program 5 id",
-    "zp5e2": "Program 5 name",
-    "zp5e3": "Program 5 reference",
-    "zp5e4": "Program 5 value",
-    "zp5e5": "Program 5 type",
-    "zp5e6": "Program 5 start time of day",
-    "zp5e7": "Program 5 duration",
-    "zp5e8": "Program 5 days to run",
-    "zp5e9": "Program 5 pump active",
-    "zp5e10": "Program 5 enable",
-    "zp5e11": "Program 5 relay 1",
-    "zp5e12": "Program 5 relay 2",
-    "zp5e13": "Program 5 exists",
-    "zp5e14": "Program 5 relay 1 light mode",
-    "zp5e15": "Program 5 relay 2 light mode",
-    "zp6e1": "Program 6 id",
-    "zp6e2": "Program 6 name",
-    "zp6e3": "Program 6 reference",
-    "zp6e4": "Program 6 value",
-    "zp6e5": "Program 6 type",
-    "zp6e6": "Program 6 start time of day",
-    "zp6e7": "Program 6 duration",
-    "zp6e8": "Program 6 days to run",
-    "zp6e9": "Program 6 pump active",
-    "zp6e10": "Program 6 enable",
-    "zp6e11": "Program 6 relay 1",
-    "zp6e12": "Program 6 relay 2",
-    "zp6e13": "Program 6 exists",
-    "zp6e14": "Program 6 relay 1 light mode",
-    "zp6e15": "Program 6 relay 2 light mode",
-    "zp7e1": "Program 7 id",
-    "zp7e2": "Program 7 name",
-    "zp7e3": "Program 7 reference",
-    "zp7e4": "Program 7 value",
-    "zp7e5": "Program 7 type",
-    "zp7e6": "Program 7 start time of day",
-    "zp7e7": "Program 7 duration",
-    "zp7e8": "Program 7 days to run",
-    "zp7e9": "Program 7 pump active",
-    "zp7e10": "Program 7 enable",
-    "zp7e11": "Program 7 relay 1",
-    "zp7e12": "Program 7 relay 2",
-    "zp7e13": "Program 7 exists",
-    "zp7e14": "Program 7 relay 1 light mode",
-    "zp7e15": "Program 7 relay 2 light mode",
-    "zp8e1": "Program 8 id",
-    "zp8e2": "Program 8 name",
-    "zp8e3": "Program 8 reference",
-    "zp8e4": "Program 8 value",
-    "zp8e5": "Program 8 type",
-    "zp8e6": "Program 8 start time of day",
-    "zp8e7": "Program 8 duration",
-    "zp8e8": "Program 8 days to run",
-    "zp8e9": "Program 8 pump active",
-    "zp8e10": "Program 8 enable",
-    "zp8e11": "Program 8 relay 1",
-    "zp8e12": "Program 8 relay 2",
-    "zp8e13": "Program 8 exists",
-    "zp8e14": "Program 8 relay 1 light mode",
-    "zp8e15": "Program 8 relay 2 light mode",
-    "zp9e2": "Program 9 name",
-    "zp9e3": "Program 9 reference",
-    "zp9e4": "Program 9 value",
-    "zp9e5": "Program 9 type",
-    "zp9e6": "Program 9 start time of day",
-    "zp9e7": "Program 9 duration",
-    "zp9e8": "Program 9 days to run",
-    "zp9e9": "Program 9 pump active",
-    "zp9e10": "Program 9 enable",
-    "zp9e11": "Program 9 relay 1",
-    "zp9e12": "Program 9 relay 2",
-    "zp9e13": "Program 9 exists",
-    "zp9e14": "Program 9 relay 1 light mode",
-    "zp9e15": "Program 9 relay 2 light mode",
-    "zp10e3": "Program 10 reference",
-    "zp10e4": "Program 10 value",
-    "zp10e5": "Program 10 type",
-    "zp11e3": "Program 11 reference",
-    "zp11e4": "Program 11 value",
-    "zp11e5": "Program 11 type",
-    "zp12e3": "Program 12 reference",
-    "zp12e4": "Program 12 value",
-    "zp12e5": "Program 12 type",
-    "zp13e3": "Program 13 reference",
-    "zp13e4": "Program 13 value",
-    "zp13e5": "Program 13 type",
-    "zp14e3": "Program 14 reference",
-    "zp14e4": "Program 14 value",
-    "zp14e5": "Program 14 type",
+    def __init__(self, data: Any) -> None:
+        """Initialize."""
+        self._data = data
+
+    def __str__(self) -> str:
+        """Return the redacted data as a string."""
+        return str(redact(self._data))
+
+    __repr__ = __str__
+
+
+def _parse_device_time(value: str) -> datetime:
+    """Parse a `%y%m%d%H%M%S` device time.
+
+    `datetime.strptime` is slow, so well-formed values are sliced directly and
+    anything else falls back to it (and its error messages).
+    """
+    if len(value) == 12 and value.isascii() and value.isdigit():
+        year = int(value[0:2])
+        try:
+            return datetime(
+                year + (2000 if year < 69 else 1900),
+                int(value[2:4]),
+                int(value[4:6]),
+                int(value[6:8]),
+                int(value[8:10]),
+                int(value[10:12]),
+            )
+        except ValueError:
+            pass
+    return datetime.strptime(value, "%y%m%d%H%M%S")
+
+
+@dataclass(frozen=True)
+class Field:
+    """Declared device field.
+
+    A raw value is converted by `type`, then divided by `scale` (`float` is
+    used if only `scale` is given), then mapped through `enum`, whose
+    unknown values are kept as they are. `unit` is for display only.
+    """
+
+    name: str
+    type: Callable[[Any], Any] | None = None
+    unit: str | None = None
+    scale: float | None = None
+    enum: Mapping[Any, Any] | None = None
+
+    @property
+    def converter(self) -> Callable[[Any], Any] | None:
+        """Return a function doing the field's conversions, if any."""
+        convert, scale, enum = self.type, self.scale, self.enum
+        if scale is not None:
+            base = convert or float
+
+            def convert(value: Any) -> Any:
+                return base(value) / scale
+
+        if enum is not None:
+            inner = convert
+
+            def convert(value: Any) -> Any:
+                if inner is not None:
+                    value = inner(value)
+                return enum.get(value, value)
+
+        return convert
+
+
+_PROGRAM_ELEMENTS: Final = {
+    1: "id",
+    2: "name",
+    3: "reference",
+    4: "value",
+    5: "type",
+    6: "start time of day",
+    7: "duration",
+    8: "days to run",
+    9: "pump active",
+    10: "enable",
+    11: "relay 1",
+    12: "relay 2",
+    13: "exists",
+    14: "relay 1 light mode",
+    15: "relay 2 light mode",
+}
+
+
+def _program_fields(
+    numbers: Iterable[int], elements: Iterable[int]
+) -> dict[str, Field]:
+    """Return the `zp<number>e<element>` fields of pump programs."""
+    elements = tuple(elements)
+    return {
+        f"zp{number}e{element}": Field(f"Program {number} {_PROGRAM_ELEMENTS[element]}")
+        for number in numbers
+        for element in elements
+    }
+
+
+INTELLIFLO_FIELDS: Final[dict[str, Field]] = {
+    "s1": Field("Device time", _parse_device_time),
+    "s2": Field("Finished good serial number"),
+    "s3": Field("Drive type"),
+    "s4": Field("Wet end type"),
+    "s5": Field("Relay installed"),
+    "s6": Field("Wifi mac address"),
+    "s7": Field("Drive software version"),
+    "s8": Field("IoT version"),
+    "s9": Field("Controller version"),
+    "s10": Field("UDM application software version"),
+    "s11": Field("Security key"),
+    "s12": Field("Checksum"),
+    "s13": Field("RSSI", int, "dBm"),
+    "s14": Field("Active program number"),
+    "s15": Field("Active reference"),
+    "s16": Field("Active value"),
+    "s17": Field("Current pressure", float, "psi", scale=10),
+    "s18": Field("Current power", int, "W"),
+    "s19": Field("Current motor speed", float, "%", scale=10),
+    "s20": Field("Alarm condition"),
+    "s21": Field("Relay 1 status"),
+    "s22": Field("Relay 2 status"),
+    "s23": Field("SSID"),
+    "s24": Field("Digital inputs"),
+    "s25": Field("Pump enabled status", bool),
+    "s26": Field("Current estimated flow", float, "gal/min", scale=10),
+    "s27": Field("Status word"),
+    "s28": Field("Remaining time"),
+    "s29": Field("Automation active"),
+    "s30": Field("Active program relay 1"),
+    "s31": Field("Active program relay 2"),
+    "s32": Field("Relay 1 remaining time"),
+    "s33": Field("Relay 2 remaining time"),
+    "s42": Field("Drive hardware version"),
+    "s43": Field("Comm board hardware version"),
+    "s44": Field("UDM assets software version"),
+    "s45": Field("UDM hardware version"),
+    "s46": Field("Drive flow table version"),
+    "s48": Field("Wifi level"),
+    "s50": Field("Feature bit"),
+    "d1": Field("Pump automation address"),
+    "d2": Field("Max speed"),
+    "d3": Field("Max flow"),
+    "d4": Field("Max pressure"),
+    "d5": Field("Priming speed"),
+    "d6": Field("Priming range"),
+    "d7": Field("Max priming duration"),
+    "d8": Field("Loss of prime"),
+    "d9": Field("Time source"),
+    "d10": Field("Flow program pressure max"),
+    "d11": Field("Thermal mode enable"),
+    "d13": Field("Thermal mode temperature"),
+    "d14": Field("Password protection scheme"),
+    "d15": Field("Password"),
+    "d16": Field("Daylight savings"),
+    "d17": Field("Device time zone"),
+    "d18": Field("Min speed"),
+    "d19": Field("Min flow"),
+    "d20": Field("Flow limit speed"),
+    "d21": Field("Pressure limit speed"),
+    "d22": Field("Priming enabled"),
+    "d23": Field("Dry start"),
+    "d24": Field("Priming delay"),
+    "d25": Field("Pump start stop"),
+    "d26": Field("Date provisioned"),
+    "d27": Field("Pump nickname"),
+    "d28": Field("Relay 1 name"),
+    "d29": Field("Relay 1 flow dependent"),
+    "d30": Field("Relay 2 name"),
+    "d31": Field("Relay 2 flow dependent"),
+    "d32": Field("Ramp rate up"),
+    "d33": Field("Ramp rate down"),
+    "d34": Field("Device resets"),
+    "d35": Field("Ble always on"),
+    "d36": Field("Relay 1 type"),
+    "d37": Field("Relay 2 type"),
+    "d38": Field("Booster pump delay"),
+    "d42": Field("Timezone string"),
+    "p1": Field("Setup complete flag"),
+    "p2": Field("Last active program"),
+    "1": Field("Pump type 1"),
+    "2": Field("Pump type 2"),
+    **_program_fields(range(1, 9), range(1, 16)),
+    **_program_fields([9], range(2, 16)),
+    **_program_fields(range(10, 15), range(3, 6)),
+}
+
+SALT_SENSOR_FIELDS: Final[dict[str, Field]] = {
+    "salt_level": Field("Salt level", int),
+    "average_salt_usage_per_day": Field("Average salt usage per day", float),
+    "low_battery_alert": Field("Low battery alert", int),
+    "sensor_fault": Field("Sensor fault", int),
+    "calibration_status_alert": Field("Calibration status alert", int),
+    "salt_level_alert": Field("Salt level alert", int),
+    "battery_level": Field("Battery level", int),
+}
+
+# Fields by `deviceType`. Other device types are decoded as IntelliFlo pumps.
+DEVICE_SCHEMAS: Final[dict[str, Mapping[str, Field]]] = {
+    "IF31": INTELLIFLO_FIELDS,
+    "SSS1": SALT_SENSOR_FIELDS,
 }
 
+API_FIELD_NAME_MAP: Final[dict[str, str]] = {
+    key: field.name for key, field in INTELLIFLO_FIELDS.items()
+}
 
 API_FIELD_VALUE_FUNCTION: Final[dict[str, Callable]] = {
-    "s1": lambda value: datetime.strptime(value, "%y%m%d%H%M%S"),  # Device time
-    "s13": int,  # RSSI (dBm)
-    "s17": _divide_by_10,  # Current pressure (psi)
-    "s18": int,  # Current power (watts)
-    "s19": _divide_by_10,  # Current motor speed (%)
-    "s25": bool,  # Pump enabled status
-    "s26": _divide_by_10,  # Current estimated flow (gallons per minute)
+    key: converter
+    for key, field in INTELLIFLO_FIELDS.items()
+    if (converter := field.converter) is not None
 }
 
 
+def _convert(key: str, name: str, function: Callable, value: Any) -> Any:
+    """Convert a value, logging and returning it unchanged on failure."""
+    try:
+        return function(value)
+    except Exception as ex:  # ignore: bare-except
+        _LOGGER.error(
+            "Could not convert key '%s%s' value '%s': %s",
+            key,
+            f" ({name})" if name != key else "",
+            value,
+            ex,
+        )
+    return value
+
+
+@cache
+def _get_decoder_plan(
+    device_type: str | None,
+) -> dict[str, tuple[str, Callable | None]]:
+    """Return the `key -> (name, function)` plan for a device type.
+
+    The plan is generated from the device type's schema on first use. Device
+    types without a schema use the IntelliFlo fields, which matches
+    `get_api_field_name_and_value`.
+    """
+    schema = DEVICE_SCHEMAS.get(device_type or "", INTELLIFLO_FIELDS)
+    return {key: (field.name, field.converter) for key, field in schema.items()}
+
+
+def decode_fields(
+    fields: Mapping[str, Any], device_type: str | None = None
+) -> dict[str, tuple[str, Any]]:
+    """Decode a device `fields` dict into `key -> (name, converted value)`."""
+    plan = _get_decoder_plan(device_type)
+    decoded: dict[str, tuple[str, Any]] = {}
+    for key, value in fields.items():
+        if (entry := plan.get(key)) is None:
+            decoded[key] = (key, value)
+            continue
+        name, function = entry
+        decoded[key] = (
+            name,
+            value if function is None else _convert(key, name, function, value),
+        )
+    return decoded
+
+
+def decode_fields_batch(
+    batch: Iterable[Mapping[str, Any]], device_type: str | None = None
+) -> list[dict[str, tuple[str, Any]]]:
+    """Decode several device `fields` dicts of the same device type."""
+    return [decode_fields(fields, device_type) for fields in batch]
+
+
 def get_api_field_name_and_value(
     key: str, value: str | int | float | datetime
 ) -> tuple[str, Any]:
     """Get the API field name and converted value."""
     name = API_FIELD_NAME_MAP.get(key, key)
-    val = value
     if _fn := API_FIELD_VALUE_FUNCTION.get(key):
-        try:
-            val = _fn(value)
-        except Exception as ex:  # ignore: bare-except
-            _LOGGER.error(
-                "Could not convert key '%s%s' value '%s': %s",
-                key,
-                f" ({name})" if name != key else "",
-                value,
-                ex,
-            )
-    return name, val
+        return name, _convert(key, name, _fn, value)
+    return name, value
+
+
+class JSONArrayParser:
+    """Incremental parser of a JSON array that yields its items as they arrive.
+
+    Only the unparsed tail of the document is buffered, so items can be
+    processed, and released, before the whole body has been received.
+    """
+
+    _WHITESPACE: Final = " \t\n\r"
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder(ENCODING)()
+        self._buffer = ""
+        self._started = False
+        self._after_item = False  # an item was parsed, a separator must follow
+        self._after_comma = False
+        self._done = False
+
+    def feed(self, data: bytes) -> list[Any]:
+        """Add a chunk of the document and return the items it completed."""
+        self._buffer += self._text.decode(data)
+        return self._parse(final=False)
+
+    def close(self) -> list[Any]:
+        """Return the remaining items, raising if the document is incomplete."""
+        self._buffer += self._text.decode(b"", final=True)
+        items = self._parse(final=True)
+        if not self._done:
+            raise ValueError("Incomplete JSON array")
+        if self._buffer.strip(self._WHITESPACE):
+            raise ValueError("Extra data after JSON array")
+        return items
+
+    def _parse(self, final: bool) -> list[Any]:
+        """Parse the complete items in the buffer."""
+        items: list[Any] = []
+        buffer, index = self._buffer, 0
+        while not self._done:
+            index = self._skip(buffer, index)
+            if index == len(buffer):
+                break
+            char = buffer[index]
+            if not self._started:
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                self._started = True
+                index += 1
+            elif self._after_item:
+                if char == ",":
+                    self._after_item, self._after_comma = False, True
+                elif char == "]":
+                    self._done = True
+                else:
+                    raise ValueError("Malformed JSON array")
+                index += 1
+            elif char in ",]":
+                if char == "," or self._after_comma:
+                    raise ValueError("Malformed JSON array")
+                self._done = True
+                index += 1
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(buffer, index)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break
+                # an item is complete once followed by a separator; until then
+                # a number may still continue in the next chunk
+                following = self._skip(buffer, end)
+                if following == len(buffer) or buffer[following] not in ",]":
+                    if final:
+                        raise ValueError("Malformed JSON array")
+                    break
+                items.append(item)
+                self._after_item, self._after_comma = True, False
+                index = end
+        self._buffer = buffer[index:]
+        return items
+
+    def _skip(self, buffer: str, index: int) -> int:
+        """Return the index of the next character that is not whitespace."""
+        while index < len(buffer) and buffer[index] in self._WHITESPACE:
+            index += 1
+        return index
+
+
+async def call_callback(callback: Callable[..., Any] | None, *args: Any) -> None:
+    """Call a sync or async callback, if any, and await its result if needed."""
+    import inspect
+
+    if callback is not None and inspect.isawaitable(result := callback(*args)):
+        await result
+
+
+async def call_nonblocking(
+    function: Callable[..., Any], *args: Any, executor: Executor | None = None
+) -> Any:
+    """Await an async function, or run a blocking one in `executor`.
+
+    The event loop's default executor is used if `executor` is not provided.
+    """
+    import asyncio
+    import inspect
+
+    if inspect.iscoroutinefunction(function):
+        return await function(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
@@ -0,0 +1,177 @@
+"""Coalescing device writer."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Iterable, Mapping
+from typing import Any, Final
+
+from .poller import Account
+from .resilience import backoff_time
+from .utils import call_nonblocking
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE: Final = 1.0  # seconds
+DEFAULT_MAX_ATTEMPTS: Final = 10
+
+
+class DeviceWriter:
+    """Queue device field updates and send them in one request per device.
+
+    A device's queued fields are sent together by `update_device()`
+    `debounce` seconds after the first of them was queued. A field written
+    again before then is sent only with its last value. Fields of a failed
+    request are queued again unless they were overwritten in the meantime,
+    and sent after a jittered exponential backoff on top of `debounce`.
+    After `max_attempts` failed requests in a row (if not `None`) they are
+    dropped.
+
+    Sent fields can be checked against polled devices with `verify()`.
+    Blocking `Pentair` accounts are updated on worker threads.
+    """
+
+    def __init__(
+        self,
+        account: Account,
+        *,
+        debounce: float = DEFAULT_DEBOUNCE,
+        max_attempts: int | None = DEFAULT_MAX_ATTEMPTS,
+    ) -> None:
+        """Initialize."""
+        self._account = account
+        self._debounce = debounce
+        self._max_attempts = max_attempts
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._due: dict[str, float] = {}
+        self._attempts: dict[str, int] = {}  # failed requests in a row
+        self._sent: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._changed = asyncio.Event()
+        self._stopped = asyncio.Event()
+
+    @property
+    def pending(self) -> dict[str, dict[str, Any]]:
+        """Return the queued fields per device."""
+        return {device_id: dict(fields) for device_id, fields in self._pending.items()}
+
+    def set(self, device_id: str, key: str, value: Any) -> None:
+        """Queue a field update of a device."""
+        self.update(device_id, {key: value})
+
+    def update(self, device_id: str, fields: Mapping[str, Any]) -> None:
+        """Queue field updates of a device."""
+        if not fields:
+            return
+        self._pending.setdefault(device_id, {}).update(fields)
+        if device_id not in self._due:
+            self._due[device_id] = time.monotonic() + self._debounce
+            self._changed.set()
+
+    def stop(self) -> None:
+        """Stop running."""
+        self._stopped.set()
+
+    async def run(self) -> None:
+        """Send queued updates as they become due until stopped.
+
+        Updates still queued when stopped are sent before returning.
+        """
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            await self.flush_due()
+            self._changed.clear()
+            delay = min(self._due.values(), default=time.monotonic() + 3600)
+            waiters = {
+                asyncio.ensure_future(self._stopped.wait()),
+                asyncio.ensure_future(self._changed.wait()),
+            }
+            _, pending = await asyncio.wait(
+                waiters,
+                timeout=max(0.0, delay - time.monotonic()),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for waiter in pending:
+                waiter.cancel()
+        await self.flush()
+
+    async def flush_due(self) -> dict[str, Exception]:
+        """Send the updates that are due, and return the errors per device."""
+        now = time.monotonic()
+        return await self.flush(
+            device_id for device_id, due in list(self._due.items()) if due <= now
+        )
+
+    async def flush(
+        self, device_ids: Iterable[str] | None = None
+    ) -> dict[str, Exception]:
+        """Send the queued updates now, and return the errors per device."""
+        batches: dict[str, dict[str, Any]] = {}
+        for device_id in list(self._pending if device_ids is None else device_ids):
+            self._due.pop(device_id, None)
+            if fields := self._pending.pop(device_id, None):
+                batches[device_id] = fields
+        results = await asyncio.gather(
+            *(
+                call_nonblocking(self._account.update_device, device_id, fields)
+                for device_id, fields in batches.items()
+            ),
+            return_exceptions=True,
+        )
+        errors: dict[str, Exception] = {}
+        for (device_id, fields), result in zip(batches.items(), results):
+            if isinstance(result, Exception):
+                errors[device_id] = result
+                self._retry(device_id, fields, result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                self._attempts.pop(device_id, None)
+                _, sent = self._sent.get(device_id, (0.0, {}))
+                self._sent[device_id] = (time.time(), {**sent, **fields})
+        return errors
+
+    def _retry(self, device_id: str, fields: dict[str, Any], error: Exception) -> None:
+        """Queue the fields of a failed request again, after a backoff."""
+        attempt = self._attempts.get(device_id, 0) + 1
+        if self._max_attempts is not None and attempt >= self._max_attempts:
+            _LOGGER.error(
+                "Error updating device %s, dropping update after %s attempts: %s",
+                device_id,
+                attempt,
+                error,
+            )
+            self._attempts.pop(device_id, None)
+            return
+        _LOGGER.error("Error updating device %s: %s", device_id, error)
+        self._attempts[device_id] = attempt
+        self._pending[device_id] = {**fields, **self._pending.get(device_id, {})}
+        self._due[device_id] = time.monotonic() + self._debounce + backoff_time(attempt)
+        self._changed.set()
+
+    def verify(
+        self, devices: Iterable[Mapping[str, Any]]
+    ) -> dict[str, dict[str, tuple[Any, Any]]]:
+        """Check sent fields against polled devices.
+
+        Returns `key -> (sent, reported)` per device for fields a device
+        reported after the update with another value. Each sent field is
+        checked once, by the first poll reported after it was sent.
+        """
+        mismatches: dict[str, dict[str, tuple[Any, Any]]] = {}
+        for device in devices:
+            device_id = device["deviceId"]
+            if (sent := self._sent.get(device_id)) is None:
+                continue
+            if (device.get("lastReport") or 0) / 1000 < sent[0]:
+                continue
+            del self._sent[device_id]
+            fields = device.get("fields") or {}
+            if different := {
+                key: (value, fields.get(key))
+                for key, value in sent[1].items()
+                if str(fields.get(key)) != str(value)
+            }:
+                mismatches[device_id] = different
+        return mismatches
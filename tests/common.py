@@ -2,6 +2,22 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any
+
+import jwt
+from botocore.credentials import Credentials
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from pypentair.const import CLIENT_ID
+from pypentair.signer import Signer
+from pypentair.utils import decode
+
 SALT_SENSOR = {
     "createdDate": 1664059201347,
     "userType": "EU",
@@ -130,3 +146,138 @@ INTELLIFLO_SENSOR = {
     "deb_off_stat": True,
     "deb_off_time": 1691197252466,
 }
+
+
+def create_tokens(
+    issuer: str,
+    *,
+    expires_in: int = 3600,
+    key: rsa.RSAPrivateKey | None = None,
+    sub: str = "user1",
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Create signed Cognito-like tokens and the JWKS to verify them."""
+    if key is None:
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(key.public_key()))
+    jwk.update({"kid": "test", "alg": "RS256", "use": "sig"})
+    exp = int(time.time()) + expires_in
+    claims = {"iss": issuer, "exp": exp, "sub": sub}
+    headers = {"kid": "test"}
+    tokens = {
+        "access_token": jwt.encode(
+            {**claims, "token_use": "access"}, key, "RS256", headers
+        ),
+        "id_token": jwt.encode(
+            {**claims, "token_use": "id", "aud": decode(CLIENT_ID)},
+            key,
+            "RS256",
+            headers,
+        ),
+        "refresh_token": "refresh",
+    }
+    return tokens, {"keys": [jwk]}
+
+
+def intelliflo_device(last_report: int | None = None, **fields: Any) -> dict[str, Any]:
+    """Return a copy of the IntelliFlo fixture with updated fields."""
+    device: dict[str, Any] = {
+        **INTELLIFLO_SENSOR,
+        "fields": {**INTELLIFLO_SENSOR["fields"], **fields},  # type: ignore[dict-item]
+    }
+    if last_report is not None:
+        device["lastReport"] = last_report
+    return device
+
+
+class FakeAccount:
+    """Blocking account standing in for `Pentair`.
+
+    Its tokens and credentials last `lifetime` seconds from each renewal. Its
+    calls raise `ValueError` if `fail`, or while `failures` remain. The
+    concurrency of `get_devices()` calls is recorded across all instances.
+    """
+
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def __init__(
+        self, lifetime: float = 3600, *, fail: bool = False, failures: int = 0
+    ) -> None:
+        """Initialize."""
+        self.lifetime = lifetime
+        self.fail = fail
+        self.failures = failures
+        self.id_token = "id-token"
+        self.tokens = {"access_token": "0"}
+        self.expiration = 0.0
+        self.calls = 0
+        self.refreshes = 0
+        self.refreshed: list[float] = []
+        self.updates: list[tuple[str, dict[str, Any]]] = []
+
+    def _check_failure(self) -> None:
+        """Raise if this call is to fail."""
+        if self.fail:
+            raise ValueError("failed")
+        if self.failures:
+            self.failures -= 1
+            raise ValueError("failed")
+
+    def get_devices(self) -> Any:
+        """Get devices."""
+        with self.lock:
+            FakeAccount.active += 1
+            FakeAccount.peak = max(FakeAccount.peak, FakeAccount.active)
+        time.sleep(0.01)
+        with self.lock:
+            FakeAccount.active -= 1
+        self._check_failure()
+        return [SALT_SENSOR]
+
+    def get_tokens(self) -> dict[str, str]:
+        """Get tokens."""
+        return self.tokens
+
+    def get_auth(self) -> Signer:
+        """Return the request signer."""
+        return Signer(Credentials("key", "secret", f"session{self.refreshes}"))
+
+    def refresh(self, margin: float) -> float:
+        """Refresh the tokens if they expire within `margin`."""
+        self.calls += 1
+        self._check_failure()
+        if (now := time.time()) >= self.expiration - margin:
+            self.refreshes += 1
+            self.refreshed.append(now)
+            self.expiration = now + self.lifetime
+            self.tokens = {"access_token": str(self.refreshes)}
+        return self.expiration
+
+    def update_device(self, device_id: str, fields: Mapping[str, Any]) -> Any:
+        """Update device fields."""
+        self._check_failure()
+        self.updates.append((device_id, dict(fields)))
+        return {}
+
+
+class FakeAsyncAccount(FakeAccount):
+    """Asynchronous account standing in for `AsyncPentair`."""
+
+    async def get_devices(self) -> Any:
+        """Get devices."""
+        await asyncio.sleep(0.01)
+        self._check_failure()
+        return [SALT_SENSOR]
+
+    async def get_tokens(self) -> dict[str, str]:  # type: ignore[override]
+        """Get tokens."""
+        return super().get_tokens()
+
+    async def refresh(self, margin: float) -> float:  # type: ignore[override]
+        """Refresh the tokens."""
+        return super().refresh(margin)
+
+    async def update_device(self, device_id: str, fields: Mapping[str, Any]) -> Any:
+        """Update device fields."""
+        return super().update_device(device_id, fields)
@@ -0,0 +1,254 @@
+"""Test asynchronous Pentair account."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pypentair import PentairAuthenticationError
+from pypentair.aio import AsyncPentair
+from pypentair.cache import MemoryCache, SQLiteCache
+from pypentair.const import USER_POOL_ID
+from pypentair.models import IntelliFloPump
+from pypentair.utils import decode
+
+from .common import INTELLIFLO_SENSOR, create_tokens
+
+
+@pytest.fixture
+async def cloud() -> AsyncIterator[dict[str, Any]]:
+    """Run a fake Pentair cloud."""
+    state: dict[str, Any] = {"calls": []}
+
+    async def cognito(request: web.Request) -> web.Response:
+        target = request.headers["X-Amz-Target"].split(".")[1]
+        state["calls"].append(target)
+        if target == "GetId":
+            return web.json_response({"IdentityId": "identity"})
+        if target == "GetCredentialsForIdentity":
+            return web.json_response(
+                {
+                    "Credentials": {
+                        "AccessKeyId": "key",
+                        "SecretKey": "secret",
+                        "SessionToken": "session",
+                        "Expiration": time.time() + 3600,
+                    }
+                }
+            )
+        if target == "InitiateAuth":
+            tokens, _ = create_tokens(state["issuer"])
+            return web.json_response(
+                {
+                    "AuthenticationResult": {
+                        "AccessToken": tokens["access_token"],
+                        "IdToken": tokens["id_token"],
+                    }
+                }
+            )
+        return web.json_response({"message": "Unsupported"}, status=400)
+
+    async def jwks(request: web.Request) -> web.Response:
+        state["jwks_requests"] = state.get("jwks_requests", 0) + 1
+        return web.json_response(state["jwks"])
+
+    async def devices(request: web.Request) -> web.Response:
+        assert request.headers["Authorization"].startswith("AWS4-HMAC-SHA256")
+        state["calls"].append("devices")
+        if delay := state.get("delay"):
+            await asyncio.sleep(delay)
+        if errors := state.get("errors"):
+            return web.Response(
+                status=errors.pop(0),
+                text="<html>Unavailable</html>",
+                content_type="text/html",
+                headers={"Retry-After": "0"},
+            )
+        return web.json_response([INTELLIFLO_SENSOR])
+
+    async def device(request: web.Request) -> web.Response:
+        state["calls"].append("device")
+        if (device_id := request.match_info["device_id"]) == "missing":
+            return web.json_response({"message": "Not found"}, status=404)
+        if device_id == "empty":
+            return web.Response()
+        return web.json_response({**INTELLIFLO_SENSOR, "deviceId": device_id})
+
+    async def update_device(request: web.Request) -> web.Response:
+        assert request.headers["Authorization"].startswith("AWS4-HMAC-SHA256")
+        state["calls"].append("update_device")
+        state["updates"] = [await request.json()]
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post("/", cognito)
+    app.router.add_get("/{pool}/.well-known/jwks.json", jwks)
+    app.router.add_get("/device/device-service/user/devices", devices)
+    app.router.add_get("/device/device-service/user/device/{device_id}", device)
+    app.router.add_post("/device/device-service/user/device/{device_id}", update_device)
+    async with TestServer(app) as server:
+        url = str(server.make_url("/"))
+        state["urls"] = {"base_url": url, "aws_endpoint_url": url}
+        state["issuer"] = f"{url}{decode(USER_POOL_ID)}"
+        yield state
+
+
+async def test_get_devices(cloud: dict[str, Any]) -> None:
+    """Test devices are fetched without blocking calls."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    async with AsyncPentair(**tokens, **cloud["urls"]) as account:
+        assert await account.get_devices() == [INTELLIFLO_SENSOR]
+        raw = await account.get_devices(raw=True)
+        assert json.loads(raw) == [INTELLIFLO_SENSOR]
+        assert await account.get_tokens() == tokens
+    assert cloud["calls"] == [
+        "GetId",
+        "GetCredentialsForIdentity",
+        "devices",
+        "devices",
+    ]
+
+
+async def test_expired_token_is_refreshed(cloud: dict[str, Any]) -> None:
+    """Test an expired access token is refreshed before requesting."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"], expires_in=-60)
+    async with AsyncPentair(**tokens, **cloud["urls"]) as account:
+        await account.get_devices()
+        assert account.access_token != tokens["access_token"]
+        assert account.refresh_token == tokens["refresh_token"]
+    assert cloud["calls"][0] == "InitiateAuth"
+
+
+async def test_invalid_token(cloud: dict[str, Any]) -> None:
+    """Test tokens signed by another key are rejected."""
+    tokens, _ = create_tokens(cloud["issuer"])
+    _, cloud["jwks"] = create_tokens(cloud["issuer"])
+    async with AsyncPentair(**tokens, **cloud["urls"]) as account:
+        with pytest.raises(PentairAuthenticationError):
+            await account.get_devices()
+
+
+async def test_cached_credentials(cloud: dict[str, Any]) -> None:
+    """Test identity credentials are shared through the cache."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    cache = MemoryCache()
+    for _ in range(2):
+        async with AsyncPentair(**tokens, **cloud["urls"], cache=cache) as account:
+            await account.get_devices()
+    assert cloud["calls"] == [
+        "GetId",
+        "GetCredentialsForIdentity",
+        "devices",
+        "devices",
+    ]
+
+
+async def test_session_is_restored(cloud: dict[str, Any], tmp_path: Path) -> None:
+    """Test a restart with a persistent cache makes no Cognito requests."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    path = tmp_path / "session.db"
+    async with AsyncPentair(
+        username="user", **tokens, **cloud["urls"], cache=SQLiteCache(path)
+    ) as account:
+        await account.get_devices()
+    async with AsyncPentair(
+        username="user", **cloud["urls"], cache=SQLiteCache(path)
+    ) as account:
+        assert await account.get_devices() == [INTELLIFLO_SENSOR]
+        assert account.access_token == tokens["access_token"]
+    assert cloud["calls"] == [
+        "GetId",
+        "GetCredentialsForIdentity",
+        "devices",
+        "devices",
+    ]
+    assert cloud["jwks_requests"] == 1
+
+
+async def test_refresh(cloud: dict[str, Any]) -> None:
+    """Test tokens and credentials are refreshed ahead of expiry."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    async with AsyncPentair(**tokens, **cloud["urls"]) as account:
+        expiration = await account.refresh()
+        assert time.time() < expiration <= time.time() + 3600
+        assert cloud["calls"] == ["GetId", "GetCredentialsForIdentity"]
+
+        await account.refresh(margin=7200)
+        assert account.access_token != tokens["access_token"]
+        await account.get_devices()
+    assert cloud["calls"][2:] == [
+        "InitiateAuth",
+        "GetCredentialsForIdentity",
+        "devices",
+    ]
+
+
+async def test_retries(cloud: dict[str, Any]) -> None:
+    """Test 5xx responses are retried and non-JSON errors are raised."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    cloud["errors"] = [503, 502]
+    async with AsyncPentair(**tokens, **cloud["urls"]) as account:
+        assert await account.get_devices() == [INTELLIFLO_SENSOR]
+        cloud["errors"] = [503, 502, 500]
+        with pytest.raises(aiohttp.ClientResponseError):
+            await account.get_devices()
+    assert cloud["calls"].count("devices") == 6
+
+
+async def test_timeout_with_caller_session(cloud: dict[str, Any]) -> None:
+    """Test the timeout also applies to a session passed by the caller."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    cloud["delay"] = 1
+    async with aiohttp.ClientSession() as session:
+        account = AsyncPentair(
+            **tokens, **cloud["urls"], session=session, timeout=0.1, retries=0
+        )
+        with pytest.raises(asyncio.TimeoutError):
+            await account.get_devices()
+
+
+async def test_raw_empty_body(cloud: dict[str, Any]) -> None:
+    """Test raw requests return an empty body as is."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    async with AsyncPentair(**tokens, **cloud["urls"]) as account:
+        assert await account.get_device("empty", raw=True) == b""
+        assert await account.get_device("empty") is None
+
+
+async def test_iter_devices(cloud: dict[str, Any]) -> None:
+    """Test devices are streamed, optionally as models."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    async with AsyncPentair(**tokens, **cloud["urls"]) as account:
+        assert [device async for device in account.iter_devices()] == [
+            INTELLIFLO_SENSOR
+        ]
+        devices = [device async for device in account.iter_devices(models=True)]
+    assert isinstance(devices[0], IntelliFloPump)
+
+
+async def test_get_devices_by_id(cloud: dict[str, Any]) -> None:
+    """Test devices are fetched concurrently, in order, with per-id errors."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    async with AsyncPentair(**tokens, **cloud["urls"]) as account:
+        result = await account.get_devices_by_id(["b", "missing", "a"])
+    assert list(result.devices) == ["b", "a"]
+    assert result.devices["a"]["deviceId"] == "a"
+    assert isinstance(result.errors["missing"], aiohttp.ClientResponseError)
+    assert cloud["calls"].count("GetCredentialsForIdentity") == 1
+
+
+async def test_update_device(cloud: dict[str, Any]) -> None:
+    """Test device fields are posted as JSON."""
+    tokens, cloud["jwks"] = create_tokens(cloud["issuer"])
+    async with AsyncPentair(**tokens, **cloud["urls"]) as account:
+        assert await account.update_device("pump", {"zp1e10": "0"}) == {}
+    assert cloud["updates"] == [{"payload": {"zp1e10": "0"}}]
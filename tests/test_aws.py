@@ -0,0 +1,13 @@
+"""Test AWS clients."""
+
+from __future__ import annotations
+
+from pypentair.aws import get_client
+
+
+def test_get_client() -> None:
+    """Test clients are shared per service and region."""
+    client = get_client("cognito-identity")
+    assert get_client("cognito-identity") is client
+    assert get_client("cognito-identity", "us-east-1") is not client
+    assert client.meta.region_name == "us-west-2"
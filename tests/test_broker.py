@@ -0,0 +1,86 @@
+"""Test the credential broker."""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from pypentair import PentairApiException
+from pypentair.broker import (
+    BrokerClient,
+    BrokeredPentair,
+    BrokerServer,
+    CredentialBroker,
+)
+from pypentair.poller import Poller
+
+from .common import SALT_SENSOR, FakeAccount
+
+AUTHKEY = b"secret"
+
+
+def _worker(address: str, name: str) -> tuple[str | None, str]:
+    """Sign requests for an account in another process."""
+    client = BrokerClient(address, AUTHKEY)
+    account = BrokeredPentair(client, name)
+    for _ in range(10):
+        auth = account.get_auth()
+    client.close()
+    return account.id_token, auth.credentials.token
+
+
+def test_broker_shares_sessions_between_processes(tmp_path: Path) -> None:
+    """Test workers share one refresh per account."""
+    accounts: dict[str, Any] = {"a": FakeAccount(), "b": FakeAccount()}
+    address = str(tmp_path / "broker.sock")
+    with BrokerServer(CredentialBroker(accounts), address, AUTHKEY):
+        with ProcessPoolExecutor(
+            3, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results = list(executor.map(_worker, [address] * 6, "abbaab"))
+
+    assert set(results) == {("id-token", "session1")}
+    assert accounts["a"].refreshes == accounts["b"].refreshes == 1
+
+
+def test_broker_errors(tmp_path: Path) -> None:
+    """Test errors are raised in the client and other keys are rejected."""
+    address = str(tmp_path / "broker.sock")
+    with BrokerServer(CredentialBroker(), address, AUTHKEY):
+        client = BrokerClient(address, AUTHKEY)
+        with pytest.raises(KeyError):
+            client.get_session("missing")
+        client.close()
+        with pytest.raises(multiprocessing.AuthenticationError):
+            BrokerClient(address, b"wrong").get_session("missing")
+
+
+async def test_brokered_account_is_polled(tmp_path: Path) -> None:
+    """Test a brokered account can be polled without tokens of its own."""
+    accounts: dict[str, Any] = {"a": FakeAccount()}
+    session = MagicMock(spec=requests.Session)
+    session.request.return_value.status_code = 200
+    session.request.return_value.content = json.dumps([SALT_SENSOR]).encode()
+    address = str(tmp_path / "broker.sock")
+    with BrokerServer(CredentialBroker(accounts), address, AUTHKEY):
+        client = BrokerClient(address, AUTHKEY)
+        account = BrokeredPentair(client, "a", session=session)
+        poller = Poller([account], spread=0, jitter=0)
+        stats = await poller.poll_once()
+        poller.close()
+        client.close()
+
+    assert stats.errors == 0
+    assert account.get_tokens() == {}
+    headers = session.request.call_args.kwargs["headers"]
+    assert headers["x-amz-id-token"] == "id-token"
+    assert headers["X-Amz-Security-Token"] == "session1"
+    with pytest.raises(PentairApiException):
+        account.authenticate("password")
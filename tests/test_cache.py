@@ -0,0 +1,185 @@
+"""Test caches."""
+
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from botocore.credentials import Credentials
+
+from pypentair import Pentair
+from pypentair.cache import FileCache, MemoryCache, ResponseCache, SQLiteCache
+from pypentair.const import REGION_NAME, USER_POOL_ID
+from pypentair.signer import Signer
+from pypentair.utils import decode
+
+from .common import create_tokens
+
+
+def test_file_cache(tmp_path: Path) -> None:
+    """Test the file cache persists values."""
+    path = tmp_path / "cache.json"
+    FileCache(path).set("key", {"value": 1})
+    assert FileCache(path).get("key") == {"value": 1}
+    assert FileCache(path).get("missing") is None
+
+
+def test_sqlite_cache(tmp_path: Path) -> None:
+    """Test the SQLite cache persists and replaces values."""
+    path = tmp_path / "cache.db"
+    cache = SQLiteCache(path)
+    cache.set("key", {"value": 1})
+    cache.set("key", {"value": 2})
+    for file in tmp_path.iterdir():  # the database and its WAL files
+        assert file.stat().st_mode & 0o777 == 0o600
+    cache.close()
+    assert SQLiteCache(path).get("key") == {"value": 2}
+    assert SQLiteCache(path).get("missing") is None
+
+
+def test_session_is_restored(tmp_path: Path) -> None:
+    """Test tokens and JWKS are restored from the cache by username."""
+    issuer = f"https://cognito-idp.{REGION_NAME}.amazonaws.com/{decode(USER_POOL_ID)}"
+    tokens, jwks = create_tokens(issuer)
+    path = tmp_path / "cache.db"
+    with patch("pycognito.requests.get") as get:
+        get.return_value.json.return_value = jwks
+        Pentair(username="user", **tokens, cache=SQLiteCache(path)).get_user()
+        account = Pentair(username="user", cache=SQLiteCache(path))
+        assert account.get_user().access_token == tokens["access_token"]
+        assert account.id_token == tokens["id_token"]
+    get.assert_called_once()
+
+
+def _set_keys(path: Path, prefix: str) -> None:
+    """Set keys in a file cache, e.g. from another process."""
+    cache = FileCache(path)
+    for index in range(20):
+        cache.set(f"{prefix}{index}", index)
+
+
+def test_file_cache_is_shared_between_processes(tmp_path: Path) -> None:
+    """Test processes writing different keys do not lose each other's keys."""
+    path = tmp_path / "cache.json"
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(_set_keys, [path] * 4, "abcd"))
+    assert len(FileCache(path)._load()) == 80
+
+
+@pytest.mark.parametrize("expires_in", [3600, 60])
+def test_credentials_are_cached(expires_in: int) -> None:
+    """Test the identity id is kept and credentials reused until expiration."""
+    tokens, _ = create_tokens("issuer")
+    client = MagicMock()
+    client.get_id.return_value = {"IdentityId": "identity"}
+    client.get_credentials_for_identity.return_value = {
+        "Credentials": {
+            "AccessKeyId": "key",
+            "SecretKey": "secret",
+            "SessionToken": "session",
+            "Expiration": datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+        }
+    }
+    cache = MemoryCache()
+    with patch("pypentair.pentair.get_client", return_value=client):
+        for _ in range(2):
+            account = Pentair(**tokens, cache=cache)
+            with patch.object(account, "get_user") as get_user:
+                get_user.return_value.access_token = tokens["access_token"]
+                account.get_auth()
+                account.get_auth()
+
+    assert client.get_id.call_count == 1
+    # credentials expiring within the margin are exchanged again
+    assert client.get_credentials_for_identity.call_count == (
+        1 if expires_in == 3600 else 4
+    )
+
+
+def _response(status_code: int, content: bytes = b"", etag: str = "") -> MagicMock:
+    """Return a mock response."""
+    response = MagicMock(spec=requests.Response)
+    response.status_code = status_code
+    response.raw = response.request = None
+    response.content = content
+    response.headers = {"ETag": etag} if etag else {}
+    return response
+
+
+def _account(
+    session: MagicMock, response_cache: ResponseCache, sub: str = "user1"
+) -> Pentair:
+    """Return an account with a mock session and credentials."""
+    tokens, _ = create_tokens("issuer", sub=sub)
+    account = Pentair(
+        id_token=tokens["id_token"], session=session, response_cache=response_cache
+    )
+    auth = Signer(Credentials("key", "secret"))
+    account.get_auth = MagicMock(return_value=auth)  # type: ignore[method-assign]
+    return account
+
+
+def test_response_cache_ttl() -> None:
+    """Test fresh responses are returned without a request."""
+    session = MagicMock(spec=requests.Session)
+    session.request.return_value = _response(200, b"[1]")
+    account = _account(
+        session, ResponseCache({"device/device-service/user/devices": 60})
+    )
+    assert account.get_devices() is account.get_devices()
+    assert session.request.call_count == 1
+
+
+def test_response_cache_unchanged_body() -> None:
+    """Test an unchanged body is not parsed again."""
+    session = MagicMock(spec=requests.Session)
+    first, second = _response(200, b"[1]"), _response(200, b"[1]")
+    session.request.side_effect = [first, second]
+    account = _account(session, ResponseCache())
+    with patch("pypentair.pentair.json_loads", wraps=json.loads) as loads:
+        assert account.get_devices() is account.get_devices()
+    loads.assert_called_once_with(b"[1]")
+
+
+def test_response_cache_raw() -> None:
+    """Test raw responses bypass the response cache."""
+    session = MagicMock(spec=requests.Session)
+    session.request.return_value = _response(200, b"[1]")
+    account = _account(
+        session, ResponseCache({"device/device-service/user/devices": 60})
+    )
+    assert account.get_devices(raw=True) == b"[1]"
+    assert account.get_devices(raw=True) == b"[1]"
+    assert account.get_devices() == [1]
+    assert session.request.call_count == 3
+
+    # an empty body is returned as is too
+    session.request.return_value = _response(200, b"")
+    assert account.get_devices(raw=True) == b""
+
+
+def test_response_cache_not_modified() -> None:
+    """Test conditional requests reuse the cached data on 304."""
+    session = MagicMock(spec=requests.Session)
+    session.request.side_effect = [_response(200, b"[1]", etag='"v1"'), _response(304)]
+    account = _account(session, ResponseCache())
+    devices = account.get_devices()
+    assert account.get_devices() is devices
+    assert session.request.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+
+def test_response_cache_is_per_user() -> None:
+    """Test accounts sharing a response cache only see their own responses."""
+    session = MagicMock(spec=requests.Session)
+    session.request.side_effect = [_response(200, b"[1]"), _response(200, b"[2]")]
+    response_cache = ResponseCache({"device/device-service/user/devices": 60})
+    first = _account(session, response_cache, "user1")
+    second = _account(session, response_cache, "user2")
+    assert first.get_devices() is not second.get_devices()
+    assert first.get_devices() is first.get_devices()
+    assert session.request.call_count == 2
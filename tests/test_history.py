@@ -0,0 +1,91 @@
+"""Test device telemetry history."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from pypentair.history import (
+    Bucket,
+    History,
+    MemoryHistory,
+    SQLiteHistory,
+    numeric_fields,
+)
+
+from .common import INTELLIFLO_SENSOR, intelliflo_device
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def history(request: pytest.FixtureRequest, tmp_path: Path) -> Iterator[History]:
+    """Return an empty history store."""
+    store: History = (
+        MemoryHistory(fields=["s18", "s19"])
+        if request.param == "memory"
+        else SQLiteHistory(tmp_path / "history.db", fields=["s18", "s19"])
+    )
+    yield store
+    store.close()
+
+
+def test_numeric_fields() -> None:
+    """Test only decoded numeric fields are kept."""
+    fields = numeric_fields(INTELLIFLO_SENSOR)
+    assert fields["s19"] == 43.2
+    assert "s1" not in fields  # device time
+    assert numeric_fields(INTELLIFLO_SENSOR, ["s18", "s1"]) == {"s18": 183.0}
+
+
+def test_history(history: History) -> None:
+    """Test recording, range queries and downsampling."""
+    device_id = str(INTELLIFLO_SENSOR["deviceId"])
+    history.record_devices(
+        [intelliflo_device(1_000 * t, s19=str(t * 10)) for t in (10, 20, 30, 70)]
+    )
+    # the same poll again, and an older one, are ignored
+    history.record_devices(
+        [intelliflo_device(30_000, s19="999"), intelliflo_device(5_000)]
+    )
+
+    timestamps, values = history.query(device_id, "s19")
+    assert list(timestamps) == [10, 20, 30, 70]
+    assert list(values) == [10, 20, 30, 70]
+    assert list(history.query(device_id, "s19", 15, 30).values) == [20, 30]
+    assert list(history.query(device_id, "s19", 71).values) == []
+    assert list(history.query(device_id, "s17").values) == []
+    assert list(history.query("unknown", "s19").values) == []
+
+    assert history.downsample(device_id, "s19", 60) == [
+        Bucket(0, 20, 10, 30, 3),
+        Bucket(60, 70, 70, 70, 1),
+    ]
+    assert history.downsample(device_id, "s19", 60, start=25) == [
+        Bucket(0, 30, 30, 30, 1),
+        Bucket(60, 70, 70, 70, 1),
+    ]
+
+
+def test_sqlite_history_persists(tmp_path: Path) -> None:
+    """Test samples survive reopening the database."""
+    history = SQLiteHistory(tmp_path / "history.db")
+    history.record("device", 1.5, {"s19": 50})
+    history.close()
+
+    history = SQLiteHistory(tmp_path / "history.db")
+    assert list(history.query("device", "s19").values) == [50]
+    history.close()
+
+
+def test_memory_history_ring() -> None:
+    """Test the in-memory history keeps only the latest samples."""
+    history = MemoryHistory(capacity=4)
+    for timestamp in range(10):
+        history.record("device", timestamp, {"s19": timestamp * 2})
+
+    timestamps, values = history.query("device", "s19")
+    assert list(timestamps) == [6, 7, 8, 9]
+    assert list(values) == [12, 14, 16, 18]
+    assert list(history.query("device", "s19", 7, 8).timestamps) == [7, 8]
+    assert list(history.query("device", "s19", end=6.5).timestamps) == [6]
@@ -1,8 +1,20 @@
 """Tests module."""
 
+import subprocess
+import sys
+
 from pypentair import __version__
 
 
 def test_version() -> None:
     """Test the version."""
     assert __version__ == "0.0.0"
+
+
+def test_lazy_import() -> None:
+    """Test importing the package does not import the AWS libraries."""
+    code = "import pypentair, sys; print('boto3' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,71 @@
+"""Test request instrumentation."""
+
+from __future__ import annotations
+
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from pypentair import Pentair
+from pypentair.cache import MemoryCache
+from pypentair.instrumentation import Histogram, MetricsCollector
+
+from .common import SALT_SENSOR, create_tokens
+
+
+def test_histogram() -> None:
+    """Test histogram percentiles and buckets."""
+    histogram = Histogram((0.1, 1.0, 10.0))
+    for value in (0.05, 0.5, 0.5, 5.0, 50.0):
+        histogram.observe(value)
+    assert histogram.percentile(50) == 1.0
+    assert histogram.percentile(100) == 50.0
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["buckets"] == [(0.1, 1), (1.0, 3), (10.0, 4), (float("inf"), 5)]
+
+
+def test_metrics_collector() -> None:
+    """Test the collector records the request path."""
+    tokens, _ = create_tokens("issuer")
+    client = MagicMock()
+    client.get_id.return_value = {"IdentityId": "identity"}
+    client.get_credentials_for_identity.return_value = {
+        "Credentials": {
+            "AccessKeyId": "key",
+            "SecretKey": "secret",
+            "SessionToken": "session",
+            "Expiration": time.time() + 3600,
+        }
+    }
+    session = MagicMock(spec=requests.Session)
+    response = session.request.return_value
+    response.status_code = 200
+    response.content = json.dumps([SALT_SENSOR]).encode()
+    response.raw.retries.history = ("retry",)
+    metrics = MetricsCollector()
+    account = Pentair(
+        **tokens, session=session, cache=MemoryCache(), instrumentation=metrics
+    )
+    with (
+        patch("pypentair.pentair.get_client", return_value=client),
+        patch.object(account, "get_user") as get_user,
+    ):
+        get_user.return_value.access_token = tokens["access_token"]
+        get_user.return_value.check_token.return_value = True
+        account.get_devices()
+        account.get_devices()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["requests"]["count"] == 2
+    assert set(snapshot["phases"]) == {"auth", "sign", "network", "parse"}
+    assert snapshot["status_codes"] == {200: 2}
+    assert snapshot["counters"] == {
+        "bytes_sent": 0,
+        "bytes_received": 2 * len(response.content),
+        "retries": 2,
+        "tokens_refreshes": 1,
+        "credentials_refreshes": 1,
+    }
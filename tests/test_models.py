@@ -0,0 +1,39 @@
+"""Test device models."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from pypentair.models import Device, IntelliFloPump, SaltLevelSensor, device_from_dict
+
+from .common import INTELLIFLO_SENSOR, SALT_SENSOR
+
+
+def test_salt_level_sensor() -> None:
+    """Test salt level sensor model."""
+    device = device_from_dict(SALT_SENSOR)
+    assert isinstance(device, SaltLevelSensor)
+    assert device.nickname == "Salt Level Sensor"
+    assert device.salt_level == 3
+    assert device.average_salt_usage_per_day == 3.51
+    assert device.fields["battery_level"] == ("Battery level", 0)
+    assert not hasattr(device, "__dict__")
+
+
+def test_intelliflo_pump() -> None:
+    """Test IntelliFlo pump model."""
+    device = device_from_dict(INTELLIFLO_SENSOR)
+    assert isinstance(device, IntelliFloPump)
+    assert device._fields is None
+    assert device.device_time == datetime(2024, 4, 17, 16, 23, 0)
+    assert device.motor_speed == 43.2
+    assert device.power == 183
+    assert device.fields["s6"] == ("Wifi mac address", "1C5A0840C400")
+    assert device.last_report_time and device.last_report_time.year == 2024
+
+
+def test_unknown_device() -> None:
+    """Test unknown device types use the generic model."""
+    device = device_from_dict({**SALT_SENSOR, "deviceType": "XYZ"})
+    assert type(device) is Device
+    assert device.get_value("missing", 1) == 1
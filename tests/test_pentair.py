@@ -2,9 +2,200 @@
 
 from __future__ import annotations
 
-from .common import SALT_SENSOR
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import requests
+from botocore.credentials import Credentials
+
+from pypentair import Pentair
+from pypentair.cache import token_expiration
+from pypentair.models import SaltLevelSensor
+from pypentair.signer import Signer
+
+from .common import INTELLIFLO_SENSOR, SALT_SENSOR, create_tokens
 
 
 def test_salt_sensor() -> None:
     """Test salt sensor."""
     assert isinstance(SALT_SENSOR, dict)
+
+
+def test_session_is_pooled() -> None:
+    """Test a pooled session is created and closed with the account."""
+    with patch.object(requests.Session, "close") as close:
+        with Pentair(pool_maxsize=25) as account:
+            adapter = account.session.get_adapter("https://api.pentair.cloud/")
+            assert adapter._pool_maxsize == 25  # type: ignore[attr-defined]
+    close.assert_called_once()
+
+
+def test_shared_session_is_not_closed() -> None:
+    """Test a provided session is reused and left open."""
+    session = MagicMock(spec=requests.Session)
+    session.request.return_value.status_code = 200
+    session.request.return_value.content = body = json.dumps([SALT_SENSOR]).encode()
+    auth = Signer(Credentials("key", "secret"))
+
+    with Pentair(id_token="token", session=session, timeout=3) as account:
+        with patch.object(account, "get_auth", return_value=auth):
+            assert account.get_devices() == [SALT_SENSOR]
+            assert account.get_devices(raw=True) == body
+
+    assert session.request.call_count == 2
+    assert session.request.call_args.kwargs["timeout"] == 3
+    session.close.assert_not_called()
+
+
+def test_concurrent_refresh_is_single_flight() -> None:
+    """Test threads sharing an account refresh expired tokens only once."""
+    expired, _ = create_tokens("issuer", expires_in=-60)
+    fresh, _ = create_tokens("issuer")
+    user = MagicMock(access_token=expired["access_token"], id_token=fresh["id_token"])
+
+    def check_token() -> bool:
+        time.sleep(0.05)
+        if token_expiration(user.access_token) > time.time():
+            return False
+        user.access_token = fresh["access_token"]
+        return True
+
+    def get_credentials_for_identity(**kwargs: str) -> dict:
+        time.sleep(0.05)
+        return {
+            "Credentials": {
+                "AccessKeyId": "key",
+                "SecretKey": "secret",
+                "SessionToken": "session",
+                "Expiration": time.time() + 3600,
+            }
+        }
+
+    user.check_token.side_effect = check_token
+    client = MagicMock()
+    client.get_id.return_value = {"IdentityId": "identity"}
+    client.get_credentials_for_identity.side_effect = get_credentials_for_identity
+    barrier = threading.Barrier(16, timeout=5)
+
+    def get_auth(_: int) -> Signer:
+        barrier.wait()
+        return account.get_auth()
+
+    account = Pentair(**expired)
+    with (
+        patch("pycognito.Cognito", return_value=user) as cognito,
+        patch("pypentair.pentair.get_client", return_value=client),
+        ThreadPoolExecutor(16) as executor,
+    ):
+        auths = set(executor.map(get_auth, range(64)))
+
+    assert len(auths) == 1
+    assert cognito.call_count == 1
+    user.renew_access_token.assert_not_called()
+    # one check when the user is created, one refresh on first use
+    assert user.check_token.call_count == 2
+    assert client.get_id.call_count == 1
+    assert client.get_credentials_for_identity.call_count == 1
+
+
+def test_iter_devices() -> None:
+    """Test devices are streamed from the response body."""
+    body = json.dumps([SALT_SENSOR, INTELLIFLO_SENSOR]).encode()
+    session = MagicMock(spec=requests.Session)
+    response = session.request.return_value
+    response.status_code = 200
+    response.raw = response.request = None
+    response.headers = {}
+    response.iter_content.side_effect = lambda size: (
+        body[index : index + 100] for index in range(0, len(body), 100)
+    )
+    auth = Signer(Credentials("key", "secret"))
+
+    with Pentair(id_token="token", session=session) as account:
+        with patch.object(account, "get_auth", return_value=auth):
+            devices = account.iter_devices(models=True)
+            session.request.assert_not_called()
+            assert isinstance(next(devices), SaltLevelSensor)
+            assert next(devices).device_type == "IF31"
+            assert list(devices) == []
+
+    assert session.request.call_args.kwargs["stream"] is True
+    response.__exit__.assert_called_once()
+
+
+def test_get_devices_by_id() -> None:
+    """Test devices are fetched concurrently, in order, with per-id errors."""
+    active = peak = 0
+    lock = threading.Lock()
+
+    def request(method: str, url: str, **kwargs: Any) -> requests.Response:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        device_id = url.rpartition("/")[2]
+        response = requests.Response()
+        response.url = url
+        if device_id == "missing":
+            response.status_code = 404
+            response._content = b"Not found"
+        else:
+            response.status_code = 200
+            response._content = json.dumps({"deviceId": device_id}).encode()
+        return response
+
+    session = MagicMock(spec=requests.Session)
+    session.request.side_effect = request
+    auth = Signer(Credentials("key", "secret"))
+    device_ids = [f"device{index}" for index in range(8)]
+
+    with Pentair(id_token="token", session=session, pool_maxsize=3) as account:
+        with patch.object(account, "get_auth", return_value=auth):
+            result = account.get_devices_by_id(
+                [*device_ids[:4], "missing", *device_ids[4:], "device0"]
+            )
+
+    assert list(result.devices) == device_ids
+    assert result.devices["device3"] == {"deviceId": "device3"}
+    assert isinstance(result.errors["missing"], requests.HTTPError)
+    assert session.request.call_count == 9
+    assert peak == 3
+
+
+def test_update_device_signs_body() -> None:
+    """Test device updates are posted as signed JSON."""
+    session = MagicMock(spec=requests.Session)
+    session.request.return_value.status_code = 200
+    session.request.return_value.content = b"{}"
+    signer = Signer(Credentials("key", "secret"))
+
+    with Pentair(id_token="token", session=session) as account:
+        with patch.object(account, "get_auth", return_value=signer):
+            assert account.update_device("pump", {"zp1e10": "0"}) == {}
+
+    (method, url), kwargs = session.request.call_args
+    assert (method, url) == (
+        "post",
+        "https://api.pentair.cloud/device/device-service/user/device/pump",
+    )
+    assert kwargs["data"] == b'{"payload": {"zp1e10": "0"}}'
+    headers = kwargs["headers"]
+    assert headers["Content-Type"] == "application/json"
+    expected = signer.sign(
+        "post",
+        url,
+        {"x-amz-id-token": "token", "Content-Type": "application/json"},
+        kwargs["data"],
+        now=datetime.strptime(headers["X-Amz-Date"], "%Y%m%dT%H%M%SZ").replace(
+            tzinfo=timezone.utc
+        ),
+    )
+    assert headers["Authorization"] == expected["Authorization"]
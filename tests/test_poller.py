@@ -0,0 +1,54 @@
+"""Test the multi-account poller."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from pypentair.poller import Poller, PollResult
+
+from .common import FakeAccount, FakeAsyncAccount
+
+
+async def test_poll_once() -> None:
+    """Test a cycle polls every account with bounded concurrency."""
+    FakeAccount.peak = 0
+    accounts: list[Any] = [FakeAccount() for _ in range(20)]
+    accounts += [FakeAccount(fail=True), FakeAsyncAccount()]
+    results: list[PollResult] = []
+    tokens: list[dict[str, str]] = []
+    poller = Poller(
+        accounts,
+        concurrency=4,
+        spread=0,
+        jitter=0,
+        on_result=results.append,
+        on_tokens=lambda account, new: tokens.append(new),
+    )
+
+    stats = await poller.poll_once()
+    assert FakeAccount.peak == 4
+    assert len(results) == len(stats.latencies) == 22
+    assert stats.errors == 1
+    assert 0 < stats.p50 <= stats.p99 <= stats.duration
+    assert tokens == []
+
+    accounts[0].tokens = {"access_token": "b"}
+    await poller.poll_once()
+    assert tokens == [{"access_token": "b"}]
+    poller.close()
+
+
+async def test_run() -> None:
+    """Test the poller runs cycles until stopped."""
+    cycles = []
+
+    def on_cycle(stats: Any) -> None:
+        cycles.append(stats)
+        if len(cycles) == 2:
+            poller.stop()
+
+    accounts: list[Any] = [FakeAsyncAccount()]
+    poller = Poller(accounts, interval=0.05, jitter=0.01, on_cycle=on_cycle)
+    await asyncio.wait_for(poller.run(), 1)
+    assert len(cycles) == 2
@@ -0,0 +1,67 @@
+"""Test the background token refresher."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from pypentair.refresher import TokenRefresher
+
+from .common import FakeAccount, FakeAsyncAccount
+
+
+async def test_refresh_ahead_of_expiry() -> None:
+    """Test accounts are refreshed ahead of expiry and tokens reported."""
+    accounts: list[Any] = [FakeAccount(1.2), FakeAsyncAccount(1.2)]
+    failing: Any = FakeAccount(1, fail=True)
+    tokens: list[tuple[Any, dict[str, str]]] = []
+    refresher = TokenRefresher(
+        [*accounts, failing],
+        margin=0,
+        jitter=0,
+        on_tokens=lambda account, new: tokens.append((account, new)),
+    )
+    task = asyncio.create_task(refresher.run())
+    await asyncio.sleep(1.5)
+    refresher.stop()
+    await task
+
+    assert [account.refreshes for account in accounts] == [2, 2]
+    assert [account.calls for account in accounts] == [2, 2]
+    for account in accounts:
+        assert [new for owner, new in tokens if owner is account] == [
+            {"access_token": "1"},
+            {"access_token": "2"},
+        ]
+    assert all(owner is not failing for owner, _ in tokens)
+
+
+async def test_refreshes_are_jittered() -> None:
+    """Test jittered accounts renew spread out, with one call per renewal."""
+    accounts: list[Any] = [FakeAccount(2) for _ in range(8)]
+    refresher = TokenRefresher(accounts, margin=0.2, jitter=0.8)
+    task = asyncio.create_task(refresher.run())
+    await asyncio.sleep(1.9)
+    refresher.stop()
+    await task
+
+    for account in accounts:
+        assert account.refreshes == account.calls == 2
+    second = [account.refreshed[1] - account.refreshed[0] for account in accounts]
+    assert all(0.9 < delay < 1.9 for delay in second)
+    assert max(second) - min(second) > 0.2
+
+
+async def test_add_account_wakes_refresher() -> None:
+    """Test an added account is refreshed without waiting for others."""
+    account: Any = FakeAccount(3600)
+    refresher = TokenRefresher()
+    task = asyncio.create_task(refresher.run())
+    await asyncio.sleep(0)
+    refresher.add_account(account)
+    await asyncio.sleep(0.1)
+    assert account.refreshes == 1
+    refresher.remove_account(account)
+    assert refresher.accounts == []
+    refresher.stop()
+    await task
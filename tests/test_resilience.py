@@ -0,0 +1,119 @@
+"""Test retries, rate limiting and circuit breaking."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Iterator
+from email.utils import formatdate
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from botocore.credentials import Credentials
+
+from benchmarks.fake_cloud import FakeCloud
+from pypentair import Pentair, PentairCircuitOpenError
+from pypentair.instrumentation import MetricsCollector
+from pypentair.resilience import CircuitBreaker, TokenBucket, retry_after
+from pypentair.signer import Signer
+
+AUTH = Signer(Credentials("key", "secret"))
+
+
+def test_token_bucket() -> None:
+    """Test bursts up to the capacity are allowed, then the rate applies."""
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_circuit_breaker() -> None:
+    """Test the circuit opens, lets one trial through and closes again."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(PentairCircuitOpenError):
+        breaker.before_request()
+
+    time.sleep(0.06)
+    breaker.before_request()
+    with pytest.raises(PentairCircuitOpenError):
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.is_open
+
+    time.sleep(0.06)
+    breaker.before_request()
+    breaker.record_success()
+    # a second request is only let through once the circuit has closed
+    breaker.before_request()
+
+
+def test_circuit_breaker_abandoned_trial() -> None:
+    """Test a trial that never records an outcome is replaced by another."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_request()  # e.g. cancelled before it completed
+    with pytest.raises(PentairCircuitOpenError):
+        breaker.before_request()
+
+    time.sleep(0.06)
+    assert not breaker.is_open
+    breaker.before_request()
+    breaker.record_success()
+    assert not breaker.is_open
+
+
+def test_retry_after() -> None:
+    """Test `Retry-After` seconds and dates are parsed."""
+    assert retry_after("3") == 3
+    assert retry_after(None) is None
+    assert retry_after("soon") is None
+    now = time.time()
+    assert retry_after(formatdate(now + 10, usegmt=True), now) == pytest.approx(
+        10, abs=1
+    )
+
+
+@pytest.fixture
+def cloud() -> Iterator[FakeCloud]:
+    """Run a fake Pentair cloud without devices."""
+    with FakeCloud(devices=0) as cloud:
+        yield cloud
+
+
+def test_retry_after_is_honored(cloud: FakeCloud) -> None:
+    """Test a 429 is retried after its `Retry-After` delay."""
+    cloud.errors = [(429, {"Retry-After": "0"}, b"")]
+    metrics = MetricsCollector()
+    with Pentair(
+        id_token="token", **cloud.client_kwargs, instrumentation=metrics
+    ) as account:
+        account.get_auth = MagicMock(return_value=AUTH)  # type: ignore[method-assign]
+        assert account.get_devices() == []
+    assert metrics.snapshot()["counters"]["retries"] == 1
+
+
+def test_error_body_is_not_parsed(cloud: FakeCloud) -> None:
+    """Test a non-JSON error body raises an HTTP error and opens the circuit."""
+    cloud.errors = [(502, {"Content-Type": "text/html"}, b"<html>Bad Gateway</html>")]
+    breaker = CircuitBreaker(failure_threshold=1)
+    with Pentair(
+        id_token="token",
+        **cloud.client_kwargs,
+        retries=0,
+        circuit_breaker=breaker,
+    ) as account:
+        account.get_auth = MagicMock(return_value=AUTH)  # type: ignore[method-assign]
+        with pytest.raises(requests.HTTPError):
+            account.get_devices()
+        with (
+            patch.object(account.session, "request") as request,
+            pytest.raises(PentairCircuitOpenError),
+        ):
+            account.get_devices()
+    request.assert_not_called()
@@ -0,0 +1,102 @@
+"""Test pump program schedules."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from pypentair.models import IntelliFloPump
+from pypentair.schedule import Program, ScheduleCache, parse_programs
+
+from .common import intelliflo_device
+
+MONDAY = datetime(2024, 4, 15)  # a Monday
+WEEKDAYS = 0b0011111
+EVERY_DAY = 0b1111111
+
+
+def _program(number: int, start: int, duration: int, days: int) -> dict[str, Any]:
+    """Return the fields of an enabled program."""
+    return {
+        f"zp{number}e2": f"Program {number}",
+        f"zp{number}e4": "1500",
+        f"zp{number}e6": str(start),
+        f"zp{number}e7": str(duration),
+        f"zp{number}e8": str(days),
+        f"zp{number}e10": "1",
+        f"zp{number}e13": "1",
+    }
+
+
+FIELDS = {
+    **_program(1, 8 * 60, 4 * 60, WEEKDAYS),  # 08:00-12:00 on weekdays
+    **_program(2, 10 * 60, 60, EVERY_DAY),  # 10:00-11:00 every day
+    **_program(3, 23 * 60, 120, 1 << 6),  # Sunday 23:00 into Monday 01:00
+    **_program(4, 0, 60, EVERY_DAY),
+    "zp4e10": "0",  # disabled
+    "zp10e4": "2000",  # not scheduled
+}
+
+
+def test_parse_programs() -> None:
+    """Test programs are parsed from the flat fields."""
+    programs = parse_programs(FIELDS)
+    assert [program.number for program in programs] == [1, 2, 3, 4, 10]
+    assert programs[0] == Program(
+        1,
+        name="Program 1",
+        value="1500",
+        start=480,
+        duration=240,
+        days=WEEKDAYS,
+        enabled=True,
+    )
+    assert [program.scheduled for program in programs] == [
+        True,
+        True,
+        True,
+        False,
+        False,
+    ]
+
+
+def test_running() -> None:
+    """Test the programs running at a time."""
+    schedule = IntelliFloPump(intelliflo_device(**FIELDS)).schedule
+
+    def numbers(at: datetime) -> list[int]:
+        return [program.number for program in schedule.running(at)]
+
+    assert numbers(MONDAY.replace(hour=0, minute=30)) == [3]
+    assert numbers(MONDAY.replace(hour=1)) == []
+    assert numbers(MONDAY.replace(hour=9)) == [1]
+    assert numbers(MONDAY.replace(hour=10, minute=59, second=59)) == [1, 2]
+    assert numbers(MONDAY.replace(day=20, hour=9)) == []  # Saturday
+    assert numbers(MONDAY.replace(day=20, hour=10)) == [2]
+
+
+def test_next_transition() -> None:
+    """Test the next change of the running programs, wrapping the week."""
+    schedule = IntelliFloPump(intelliflo_device(**FIELDS)).schedule
+    at, running = schedule.next_transition(MONDAY.replace(hour=8)) or (None, ())
+    assert at == MONDAY.replace(hour=10)
+    assert [program.number for program in running] == [1, 2]
+
+    sunday = MONDAY.replace(day=21, hour=23, minute=30)
+    at, running = schedule.next_transition(sunday) or (None, ())
+    assert at == MONDAY.replace(day=22, hour=1)
+    assert running == ()
+
+    assert IntelliFloPump(intelliflo_device()).schedule.next_transition(MONDAY) is None
+
+
+def test_schedule_cache() -> None:
+    """Test schedules are rebuilt only when the program fields change."""
+    cache = ScheduleCache()
+    schedule = cache.get({**intelliflo_device(**FIELDS), "lastReport": 1})
+    assert cache.get({**intelliflo_device(**FIELDS), "lastReport": 2}) is schedule
+    changed = cache.get(
+        {**intelliflo_device(**{**FIELDS, "zp1e6": "0"}), "lastReport": 3}
+    )
+    assert changed is not schedule
+    assert changed.programs[0].start == 0
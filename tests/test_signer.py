@@ -0,0 +1,55 @@
+"""Test request signing."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+from pypentair.const import REGION_NAME
+from pypentair.signer import Signer, _hmac
+
+NOW = datetime(2024, 5, 6, 7, 8, 9, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("token", ["session-token", None])
+@pytest.mark.parametrize(
+    ("method", "url", "body"),
+    [
+        ("GET", "https://api.pentair.cloud/device/device-service/user/devices", b""),
+        ("GET", "https://api.pentair.cloud/a/b c/../d?z=1&a=2&a=1", b""),
+        ("POST", "http://localhost:8080/device/abc", b'{"payload": {"s14": 1}}'),
+    ],
+)
+def test_sign_matches_botocore(
+    token: str | None, method: str, url: str, body: bytes
+) -> None:
+    """Test the signed headers match botocore's `SigV4Auth`."""
+    credentials = Credentials("key", "secret", token)
+    headers = {"x-amz-id-token": "id  token"}
+
+    request = AWSRequest(method=method, url=url, headers=headers, data=body)
+    with patch(
+        "botocore.auth.get_current_datetime", return_value=NOW.replace(tzinfo=None)
+    ):
+        SigV4Auth(credentials, "execute-api", REGION_NAME).add_auth(request)
+
+    signed = Signer(credentials).sign(method, url, headers, body, now=NOW)
+    assert signed == dict(request.headers)
+    assert headers == {"x-amz-id-token": "id  token"}
+
+
+def test_signing_key_is_cached() -> None:
+    """Test the signing key is derived once per date."""
+    signer = Signer(Credentials("key", "secret"))
+    url = "https://api.pentair.cloud/"
+    with patch("pypentair.signer._hmac", wraps=_hmac) as derive:
+        first = signer.sign("GET", url, now=NOW)
+        assert signer.sign("GET", url, now=NOW) == first
+        assert derive.call_count == 4
+        signer.sign("GET", url, now=NOW + timedelta(days=1))
+        assert derive.call_count == 8
@@ -0,0 +1,34 @@
+"""Test device change tracking."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from pypentair.tracker import DeviceTracker, FieldChange
+
+from .common import INTELLIFLO_SENSOR, intelliflo_device
+
+
+def test_tracker() -> None:
+    """Test only changed fields are reported."""
+    tracker = DeviceTracker()
+    changes = tracker.update([intelliflo_device(1)])
+    assert len(changes) == len(INTELLIFLO_SENSOR["fields"])  # type: ignore[arg-type]
+    assert (
+        FieldChange(
+            "**REDACTED**", "s1", "Device time", None, datetime(2024, 4, 17, 16, 23)
+        )
+        in changes
+    )
+
+    # unchanged lastReport short-circuits even if the fields differ
+    assert tracker.update([intelliflo_device(1, s19="500")]) == []
+
+    assert tracker.update([intelliflo_device(2, s19="500", s99="1")]) == [
+        FieldChange("**REDACTED**", "s19", "Current motor speed", 43.2, 50.0),
+        FieldChange("**REDACTED**", "s99", "s99", None, "1"),
+    ]
+    assert tracker.update([intelliflo_device(3, s19="500")]) == [
+        FieldChange("**REDACTED**", "s99", "s99", "1", None),
+    ]
+    assert tracker.update([intelliflo_device(4, s19="500")]) == []
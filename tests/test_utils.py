@@ -2,14 +2,27 @@
 
 from __future__ import annotations
 
+import json
+import logging
 from datetime import datetime
 from typing import cast
 
 import pytest
 
-from pypentair.utils import REDACTED, get_api_field_name_and_value, redact
+from pypentair.utils import (
+    API_FIELD_NAME_MAP,
+    API_FIELD_VALUE_FUNCTION,
+    REDACTED,
+    Field,
+    JSONArrayParser,
+    LazyRedact,
+    decode_fields,
+    decode_fields_batch,
+    get_api_field_name_and_value,
+    redact,
+)
 
-from .common import INTELLIFLO_SENSOR
+from .common import INTELLIFLO_SENSOR, SALT_SENSOR
 
 
 def test_redact() -> None:
@@ -18,6 +31,30 @@ def test_redact() -> None:
     assert redact(test_dict) == {"email": REDACTED}
 
 
+def test_redact_copies_only_redacted_paths() -> None:
+    """Test subtrees without sensitive fields are not copied."""
+    device = {**SALT_SENSOR, "deviceId": "id", "email": ""}
+    data = {"data": [device, {"value": 1}]}
+    redacted = redact(data)
+    assert redacted["data"][0]["deviceId"] == REDACTED
+    assert redacted["data"][0]["email"] == ""
+    assert redacted["data"][0]["fields"] is device["fields"]
+    assert redacted["data"][1] is data["data"][1]
+    assert device["deviceId"] == "id"
+    assert redact(SALT_SENSOR["fields"]) is SALT_SENSOR["fields"]
+
+
+def test_lazy_redact(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test lazy redaction only happens when formatted."""
+    calls = []
+    monkeypatch.setattr("pypentair.utils.redact", lambda data: calls.append(data))
+    lazy = LazyRedact({"email": "some_email"})
+    logging.getLogger("pypentair.test").debug("%s", lazy)
+    assert not calls
+    str(lazy)
+    assert calls == [{"email": "some_email"}]
+
+
 @pytest.mark.parametrize(
     "key,name,value",
     [
@@ -46,3 +83,85 @@ def test_field_mapping_error(caplog: pytest.LogCaptureFixture) -> None:
         "Could not convert key 's1 (Device time)' value '00': time data '00' does not match format '%y%m%d%H%M%S'"
         in caplog.messages
     )
+
+
+@pytest.mark.parametrize(
+    "value", ["240417162300", "690101000000", "681231235959", "991231235959"]
+)
+def test_device_time(value: str) -> None:
+    """Test the device time parser matches strptime."""
+    assert API_FIELD_VALUE_FUNCTION["s1"](value) == datetime.strptime(
+        value, "%y%m%d%H%M%S"
+    )
+
+
+@pytest.mark.parametrize("value", ["241317162300", "240230162300", "24041716230x"])
+def test_device_time_invalid(value: str) -> None:
+    """Test invalid device times raise like strptime."""
+    with pytest.raises(ValueError):
+        API_FIELD_VALUE_FUNCTION["s1"](value)
+
+
+def test_decode_fields() -> None:
+    """Test decoding a whole fields dict matches decoding key by key."""
+    fields = cast(dict, INTELLIFLO_SENSOR["fields"])
+    decoded = decode_fields(fields, "IF31")
+    assert decoded == {
+        key: get_api_field_name_and_value(key, value) for key, value in fields.items()
+    }
+    assert decoded["s19"] == (API_FIELD_NAME_MAP["s19"], 43.2)
+    assert decoded["s34"] == ("s34", "11725")
+    assert decode_fields_batch([fields, fields]) == [decoded, decoded]
+
+
+def test_decode_salt_sensor_fields() -> None:
+    """Test salt sensor fields are decoded with their own schema."""
+    decoded = decode_fields(cast(dict, SALT_SENSOR["fields"]), "SSS1")
+    assert decoded["salt_level"] == ("Salt level", 3)
+    assert decoded["average_salt_usage_per_day"] == ("Average salt usage per day", 3.51)
+    assert decoded["battery_level"] == ("Battery level", 0)
+
+
+def test_field_converter() -> None:
+    """Test the converter generated for a declared field."""
+    assert Field("Name").converter is None
+    assert Field("Time", int).converter is int
+    scaled = Field("Speed", unit="%", scale=10).converter
+    assert scaled is not None and scaled("432") == 43.2
+    mode = Field("Mode", int, enum={0: "off", 1: "on"}).converter
+    assert mode is not None
+    assert [mode("0"), mode("1"), mode("2")] == ["off", "on", 2]
+
+
+@pytest.mark.parametrize("size", [1, 3, 64, 4096])
+def test_json_array_parser(size: int) -> None:
+    """Test array items are parsed across arbitrary chunk boundaries."""
+    data = [SALT_SENSOR, INTELLIFLO_SENSOR, 12.5, "é,]", None, [], 10]
+    document = json.dumps(data, ensure_ascii=False).encode()
+    parser = JSONArrayParser()
+    items = []
+    for index in range(0, len(document), size):
+        items.extend(parser.feed(document[index : index + size]))
+    assert items + parser.close() == data
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        b"{}",
+        b"[1, 2",
+        b"[1 2]",
+        b"[,1]",
+        b"[1,,2]",
+        b"[1,]",
+        b"[,]",
+        b"[1,2]]]",
+        b"[1]garbage",
+    ],
+)
+def test_json_array_parser_invalid(document: bytes) -> None:
+    """Test invalid or incomplete documents raise."""
+    parser = JSONArrayParser()
+    with pytest.raises(ValueError):
+        parser.feed(document)
+        parser.close()
@@ -0,0 +1,80 @@
+"""Test the coalescing device writer."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+from unittest.mock import patch
+
+from pypentair.writer import DeviceWriter
+
+from .common import FakeAccount, FakeAsyncAccount
+
+
+async def test_writes_are_coalesced() -> None:
+    """Test writes to a device are sent once, with the last value per field."""
+    for account in (FakeAccount(), FakeAsyncAccount()):
+        writer = DeviceWriter(account, debounce=0.05)  # type: ignore[arg-type]
+        task = asyncio.create_task(writer.run())
+        for speed in range(50):
+            writer.set("pump1", "s16", speed)
+            writer.set("pump2", "s16", speed)
+        writer.update("pump1", {"zp1e10": "0", "zp2e10": "1"})
+        await asyncio.sleep(0.1)
+        writer.set("pump1", "zp2e10", "0")
+        writer.stop()
+        await task
+
+        assert sorted(account.updates, key=lambda update: update[0]) == [
+            ("pump1", {"s16": 49, "zp1e10": "0", "zp2e10": "1"}),
+            ("pump1", {"zp2e10": "0"}),
+            ("pump2", {"s16": 49}),
+        ]
+        assert writer.pending == {}
+
+
+async def test_failed_writes_are_requeued() -> None:
+    """Test fields of a failed write are queued again unless overwritten."""
+    account = FakeAccount(failures=1)
+    writer = DeviceWriter(account)  # type: ignore[arg-type]
+    writer.update("pump", {"s16": 1, "zp1e10": "1"})
+    errors = await writer.flush()
+    assert isinstance(errors["pump"], ValueError)
+
+    writer.set("pump", "s16", 2)
+    assert await writer.flush() == {}
+    assert account.updates == [("pump", {"s16": 2, "zp1e10": "1"})]
+
+
+async def test_failed_writes_back_off() -> None:
+    """Test failed writes are retried after a backoff and dropped eventually."""
+    account = FakeAccount(failures=10)
+    writer = DeviceWriter(account, debounce=0, max_attempts=3)  # type: ignore[arg-type]
+    writer.set("pump", "s16", 1)
+    with patch("pypentair.writer.backoff_time", return_value=60) as backoff:
+        assert "pump" in await writer.flush_due()
+        assert await writer.flush_due() == {}  # backing off
+        assert writer.pending == {"pump": {"s16": 1}}
+        assert "pump" in await writer.flush()
+        assert "pump" in await writer.flush()
+    assert [call.args for call in backoff.call_args_list] == [(1,), (2,)]
+    assert writer.pending == {}
+    assert account.failures == 7
+
+
+async def test_verify() -> None:
+    """Test sent fields are checked against the next poll reported after them."""
+    writer = DeviceWriter(FakeAccount())  # type: ignore[arg-type]
+    writer.update("pump", {"s16": 1500, "zp1e10": "0"})
+    await writer.flush()
+
+    def device(last_report: float, **fields: Any) -> dict[str, Any]:
+        return {"deviceId": "pump", "lastReport": last_report * 1000, "fields": fields}
+
+    assert writer.verify([device(time.time() - 60, s16="1000")]) == {}
+    assert writer.verify([device(time.time() + 1, s16="1500", zp1e10="1")]) == {
+        "pump": {"zp1e10": ("0", "1")}
+    }
+    # each sent field is only checked once
+    assert writer.verify([device(time.time() + 2, s16="1000")]) == {}